@@ -0,0 +1,145 @@
+"""Measure the latency and exact match of each decoding profile
+
+Runs the model over data/datasets/vxnli-v1/test.ndjson (tables from nvBench,
+see README.md) and writes a markdown table, with the VegaZero token lengths
+bounding decoding.FAST.max_new_tokens.
+
+    python benchmarks/decoding_profiles.py --model kwkty/vxnli-v1
+
+--lengths-only measures the token lengths with the tokenizer alone.
+"""
+
+import argparse
+import statistics
+import time
+
+from pathlib import Path
+from typing import List
+
+from vxnli import decoding
+from vxnli.dataset import DATABASE_DIR, DATASET_DIR, iter_examples, load_table
+
+
+def percentile(values: list, p: float) -> float:
+    values = sorted(values)
+
+    return values[min(int(p * len(values)), len(values) - 1)]
+
+
+def target_lengths(tokenizer, path: Path) -> List[int]:
+    # Including BOS/EOS, as generated
+    return [
+        len(tokenizer(answer=example["vega_zero"])["input_ids"])
+        for example in iter_examples(path)
+    ]
+
+
+def length_rows(tokenizer, dataset_dir: Path) -> List[str]:
+    rows = []
+
+    for split in ["train", "val", "test"]:
+        lengths = target_lengths(tokenizer, dataset_dir.joinpath(f"{split}.ndjson"))
+
+        rows.append(
+            f"| {split} | {len(lengths)} | {percentile(lengths, 0.5)} "
+            f"| {percentile(lengths, 0.95)} | {percentile(lengths, 0.99)} "
+            f"| {max(lengths)} |"
+        )
+
+        print(rows[-1])
+
+    return rows
+
+
+def profile_rows(model, examples: list, database_dir: Path) -> List[str]:
+    tables = {
+        (e["db_id"], e["table"]): load_table(e["db_id"], e["table"], database_dir)
+        for e in examples
+    }
+
+    rows = []
+
+    for profile in decoding.PROFILES.values():
+        latencies, matches = [], []
+
+        with decoding.using(profile):
+            for example in examples:
+                table = tables[(example["db_id"], example["table"])]
+
+                start_time = time.perf_counter()
+                pred = model(table, *example["args"], **example["kwargs"])
+                latencies.append(time.perf_counter() - start_time)
+
+                matches.append(pred == example["vega_zero"])
+
+        rows.append(
+            f"| {profile.name} | {profile.num_beams} | {profile.max_new_tokens} "
+            f"| {statistics.median(latencies):.3f} | {percentile(latencies, 0.95):.3f} "
+            f"| {sum(matches) / len(matches):.3f} |"
+        )
+
+        print(rows[-1])
+
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default="kwkty/vxnli-v1")
+    parser.add_argument("--version", default="v1", choices=["v0", "v1"])
+    parser.add_argument("--dataset-dir", type=Path, default=DATASET_DIR)
+    parser.add_argument("--database-dir", type=Path, default=DATABASE_DIR)
+    parser.add_argument("--lengths-only", action="store_true")
+    parser.add_argument(
+        "--output", type=Path, default=Path("benchmarks/decoding_profiles.md")
+    )
+
+    args = parser.parse_args()
+
+    test_path = args.dataset_dir.joinpath("test.ndjson")
+    lines = []
+
+    if args.lengths_only:
+        from transformers import TapexTokenizer
+
+        tokenizer = TapexTokenizer.from_pretrained(args.model)
+    else:
+        if args.version == "v0":
+            from vxnli.models.v0.model import Model
+        else:
+            from vxnli.models.v1.model import Model
+
+        model = Model(args.model)
+        tokenizer = model.tokenizer
+
+        examples = list(iter_examples(test_path))
+
+        if args.version == "v0":
+            # v0 supports single nl queries only
+            examples = [
+                e for e in examples if len(e["kwargs"]) == 0 and len(e["args"]) == 1
+            ]
+
+        lines += [
+            f"Model: {args.model}, {len(examples)} examples of {test_path}",
+            "",
+            "| profile | num_beams | max_new_tokens | p50 (s) | p95 (s) | exact match |",
+            "|---|---|---|---|---|---|",
+            *profile_rows(model, examples, args.database_dir),
+            "",
+        ]
+
+    lines += [
+        f"VegaZero lengths in tokens (with BOS/EOS) of {args.dataset_dir}",
+        "",
+        "| split | examples | p50 | p95 | p99 | max |",
+        "|---|---|---|---|---|---|",
+        *length_rows(tokenizer, args.dataset_dir),
+    ]
+
+    with open(args.output, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Measure the model start-up time and memory
+
+Each load runs in a fresh process, as it does on an autoscaled worker.
+
+    python -m vxnli.models.artifact kwkty/vxnli-v1 data/models/vxnli-v1
+    python benchmarks/load_time.py kwkty/vxnli-v1 data/models/vxnli-v1
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+
+_LOAD = """
+import json, resource, time
+
+start_time = time.perf_counter()
+
+from vxnli.models.{version}.model import Model
+
+import_time = time.perf_counter() - start_time
+
+Model({model!r})
+
+print(json.dumps({{
+    "import_time": import_time,
+    "load_time": time.perf_counter() - start_time - import_time,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}}))
+"""
+
+
+def measure(model: str, version: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", _LOAD.format(model=model, version=version)],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+
+    return json.loads(output.stdout.splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("models", nargs="+", help="Hub names or artifact paths")
+    parser.add_argument("--version", default="v1", choices=["v0", "v1"])
+    parser.add_argument("--repeat", type=int, default=5)
+
+    args = parser.parse_args()
+
+    print("model\tload_time (median s)\tmax_rss (median MB)")
+
+    for model in args.models:
+        # Warm up the hub cache and the page cache
+        measure(model, args.version)
+
+        results = [measure(model, args.version) for _ in range(args.repeat)]
+
+        load_time = statistics.median(r["load_time"] for r in results)
+        max_rss = statistics.median(r["max_rss_mb"] for r in results)
+
+        print(f"{model}\t{load_time:.3f}\t{max_rss:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import json
+
+import pandas as pd
+import pytest
+import torch
+
+from safetensors.torch import load_file, save_file
+from transformers import BartConfig, BartForConditionalGeneration
+
+from vxnli.errors import Error
+from vxnli.models import artifact
+from vxnli.models.v0.model import Model
+
+
+@pytest.fixture(scope="module")
+def table_example_01():
+    return pd.DataFrame(
+        {
+            "Name": ["Bremen", "Culver", "Glenn", "Jimtown"],
+            "Enrollment": [495, 287, 605, 601],
+            "County": ["50 Marshall", "50 Marshall", "71 St. Joseph", "20 Elkhart"],
+        }
+    )
+
+
+def test_export_and_load(tmp_path, table_example_01):
+    artifact.export("kwkty/vxnli-v0", tmp_path)
+
+    assert artifact.is_artifact(tmp_path)
+
+    model = Model(tmp_path)
+
+    # Tied weights must stay tied after loading
+    assert model.model.lm_head.weight is model.model.model.shared.weight
+
+    query = "show the enrollment of each school with a bar chart."
+
+    assert model(table_example_01, query) == Model()(table_example_01, query)
+
+
+@pytest.fixture
+def tiny_model(tmp_path):
+    path = tmp_path.joinpath("tiny")
+    path.mkdir()
+
+    vocab = {"<s>": 0, "<pad>": 1, "</s>": 2, "<unk>": 3, "a": 4, "b": 5}
+
+    path.joinpath("vocab.json").write_text(json.dumps(vocab))
+    path.joinpath("merges.txt").write_text("#version: 0.2\n")
+
+    config = BartConfig(
+        vocab_size=len(vocab),
+        d_model=16,
+        encoder_layers=1,
+        decoder_layers=1,
+        encoder_attention_heads=2,
+        decoder_attention_heads=2,
+        encoder_ffn_dim=16,
+        decoder_ffn_dim=16,
+        max_position_embeddings=32,
+    )
+    BartForConditionalGeneration(config).save_pretrained(path)
+
+    return path
+
+
+def test_load_tiny(tmp_path, tiny_model):
+    output_dir = artifact.export(tiny_model, tmp_path.joinpath("artifact"))
+
+    _, model = artifact.load(output_dir)
+    expected = BartForConditionalGeneration.from_pretrained(tiny_model).eval()
+
+    assert model.lm_head.weight is model.model.shared.weight
+
+    input_ids = torch.tensor([[0, 4, 5, 2]])
+
+    with torch.no_grad():
+        assert torch.equal(
+            model(input_ids=input_ids).logits, expected(input_ids=input_ids).logits
+        )
+
+
+def test_load_missing_weights(tmp_path, tiny_model):
+    output_dir = artifact.export(tiny_model, tmp_path.joinpath("artifact"))
+    weights_path = output_dir.joinpath(artifact.WEIGHTS_FILE)
+
+    tensors = load_file(str(weights_path))
+    del tensors["final_logits_bias"]
+    save_file(tensors, str(weights_path))
+
+    with pytest.raises(Error, match="final_logits_bias"):
+        artifact.load(output_dir)
@@ -0,0 +1,49 @@
+from typing import Optional
+
+import pytest
+
+from vxnli._columns import column_index, repair
+from vxnli._vega_zero import VegaZero
+
+
+COLUMNS = ("shop_id", "shop_name", "name", "hire_date", "all_games_percent")
+
+
+@pytest.mark.parametrize(
+    "name, expected",
+    [
+        ("shop_id", "shop_id"),
+        ("shop id", "shop_id"),
+        ("shopid", "shop_id"),
+        ("hiredate", "hire_date"),
+        ("all_games_percentage", "all_games_percent"),
+        # Ambiguous between shop_id and shop_name
+        ("shop", None),
+        ("salary", None),
+        ("hire_dte", "hire_date"),
+    ],
+)
+def test_column_index_match(name: str, expected: Optional[str]):
+    assert column_index(COLUMNS).match(name) == expected
+
+
+def test_column_index_match_different_word():
+    # Similar trigrams, but another column
+    assert column_index(("height", "name")).match("weight") is None
+
+
+def test_repair():
+    vega_zero = VegaZero.parse(
+        'mark bar encoding x shopid y aggregate none all_games_percentage transform filter hiredate < "2002-06-21" and name = "shop" sort y desc'
+    )
+
+    vega_zero, repairs = repair(vega_zero, [col.upper() for col in COLUMNS])
+
+    assert str(vega_zero) == (
+        'mark bar encoding x shop_id y aggregate none all_games_percent transform filter hire_date < "2002-06-21" and name = "shop" sort y desc'
+    )
+    assert repairs == [
+        ("shopid", "shop_id"),
+        ("all_games_percentage", "all_games_percent"),
+        ("hiredate", "hire_date"),
+    ]
@@ -0,0 +1,19 @@
+import json
+
+from vxnli import config
+from vxnli.config import HostConfig
+
+
+def test_load_default(tmp_path):
+    assert config.load(tmp_path.joinpath("missing.json")) == HostConfig()
+
+
+def test_save_and_load(tmp_path, monkeypatch):
+    monkeypatch.setenv("VXNLI_CONFIG", str(tmp_path.joinpath("config.json")))
+
+    host_config = HostConfig(intra_op_threads=4, inter_op_threads=1, batch_size=8)
+    path = config.save(host_config, measured={"throughput": 1.0})
+
+    assert path == tmp_path.joinpath("config.json")
+    assert json.loads(path.read_text())["measured"] == {"throughput": 1.0}
+    assert config.load() == host_config
@@ -0,0 +1,45 @@
+import json
+
+from pathlib import Path
+
+from vxnli.dataset import DATASET_DIR, TokenizedDataset, iter_examples, write_shard
+
+
+ROOT_DIR = Path(__file__).parents[1]
+
+
+def test_iter_examples():
+    examples = list(iter_examples(ROOT_DIR.joinpath(DATASET_DIR, "test.ndjson")))
+
+    assert len(examples) == 270
+    assert {"db_id", "table", "vega_zero", "args", "kwargs"} <= examples[0].keys()
+
+
+def test_tokenized_dataset(tmp_path):
+    shards = [
+        ([[0, 5, 2], [0, 7, 8, 9, 2]], [[0, 1, 2], [0, 2]]),
+        ([[0, 2]], [[0, 3, 3, 2]]),
+    ]
+
+    for i, (input_ids, labels) in enumerate(shards):
+        write_shard(tmp_path.joinpath(f"shard-{i:05d}"), input_ids, labels)
+
+    manifest = {
+        "shards": [
+            {"name": f"shard-{i:05d}", "size": len(input_ids)}
+            for i, (input_ids, _) in enumerate(shards)
+        ]
+    }
+
+    with open(tmp_path.joinpath("manifest.json"), "w") as f:
+        json.dump(manifest, f)
+
+    dataset = TokenizedDataset(tmp_path)
+
+    assert len(dataset) == 3
+    assert dataset[1] == {
+        "input_ids": [0, 7, 8, 9, 2],
+        "labels": [0, 2],
+        "attention_mask": [1, 1, 1, 1, 1],
+    }
+    assert dataset[-1]["labels"] == [0, 3, 3, 2]
@@ -0,0 +1,291 @@
+import time
+
+from typing import Optional
+
+import pandas as pd
+import pytest
+
+from vxnli import _deadline, decoding
+from vxnli.errors import DeadlineExceededError, InputError
+from vxnli.plot import Plot
+
+
+VEGA_ZERO = "mark bar encoding x name y aggregate none weight transform sort x asc"
+
+
+class SlowModel:
+    """Emit one token per delay seconds, stopping at the deadline like generate()"""
+
+    def __init__(
+        self, vega_zero: str, delay: float, timeout: Optional[float] = None
+    ) -> None:
+        self.vega_zero = vega_zero
+        self.delay = delay
+        self.timeout = timeout
+
+    def __call__(self, table: pd.DataFrame, *args, **kwargs) -> str:
+        tokens = []
+
+        # The model's own timeout tightens the deadline, as stopping_criteria
+        with _deadline.deadline(self.timeout):
+            for token in self.vega_zero.split():
+                if _deadline.expired():
+                    _deadline.cut()
+                    break
+
+                time.sleep(self.delay)
+                tokens.append(token)
+
+        return " ".join(tokens)
+
+
+@pytest.fixture(scope="module")
+def table():
+    return pd.DataFrame({"Name": ["A", "B", "C"], "Weight": [3, 1, 2]})
+
+
+def test_call(table):
+    plot = Plot(model=lambda *args, **kwargs: VEGA_ZERO)
+    plot(table, "show weight by name")
+
+    assert plot.last_call.source == "model"
+    assert plot.last_call.vega_zero == VEGA_ZERO
+
+
+def test_call_kwargs_data(table):
+    plot = Plot(model=lambda data, *args, **kwargs: f"{VEGA_ZERO} topk {kwargs['n']}")
+    plot(data=table, n=2)
+
+    assert plot.last_call.vega_zero == f"{VEGA_ZERO} topk 2"
+
+
+def test_call_without_timeout(table):
+    plot = Plot(model=SlowModel(VEGA_ZERO, delay=0.001))
+    plot(table, "show weight by name")
+
+    assert plot.last_call.source == "model"
+    assert plot.last_call.vega_zero == VEGA_ZERO
+
+
+def test_call_timeout_partial(table):
+    # The encoding is complete after 9 tokens, the transform is cut
+    plot = Plot(model=SlowModel(VEGA_ZERO, delay=0.02), timeout=0.21)
+    plot(table, "show weight by name")
+
+    assert plot.last_call.source == "partial"
+    assert plot.last_call.vega_zero.startswith(
+        "mark bar encoding x name y aggregate none weight"
+    )
+    assert plot.last_call.prediction_time < 0.5
+
+
+def test_call_model_timeout(table):
+    # No Plot timeout, the model stops at its own
+    plot = Plot(model=SlowModel(VEGA_ZERO, delay=0.02, timeout=0.21))
+    plot(table, "show weight by name")
+
+    assert plot.last_call.source == "partial"
+
+
+class CutModel:
+    """Return a fixed output, reported as cut by the deadline"""
+
+    def __init__(self, vega_zero: str) -> None:
+        self.vega_zero = vega_zero
+
+    def __call__(self, table: pd.DataFrame, *args, **kwargs) -> str:
+        _deadline.cut()
+
+        return self.vega_zero
+
+
+@pytest.mark.parametrize(
+    "vega_zero, expected",
+    [
+        # The last column might be cut
+        ("mark bar encoding x name y aggregate none wei", None),
+        ("mark bar encoding x name y aggregate none weight", None),
+        (
+            "mark bar encoding x name y aggregate none weight transform filter weight >",
+            "mark bar encoding x name y aggregate none weight",
+        ),
+        (
+            "mark bar encoding x name y aggregate none weight transform sort x asc topk 1",
+            "mark bar encoding x name y aggregate none weight transform sort x asc",
+        ),
+    ],
+)
+def test_call_timeout_complete_clauses(table, vega_zero, expected):
+    fallback = "mark line encoding x name y aggregate none weight"
+    plot = Plot(
+        model=CutModel(vega_zero),
+        timeout=10,
+        fallback=lambda *args, **kwargs: fallback,
+    )
+    plot(table, "show weight by name")
+
+    if expected is None:
+        assert plot.last_call.source == "fallback"
+        assert plot.last_call.vega_zero == fallback
+    else:
+        assert plot.last_call.source == "partial"
+        assert plot.last_call.vega_zero == expected
+
+
+def test_call_complete_at_deadline(table):
+    # Finished without being cut, even if the deadline passed meanwhile
+    def model(*args, **kwargs):
+        time.sleep(0.1)
+
+        return VEGA_ZERO
+
+    plot = Plot(model=model, timeout=0.05)
+    plot(table, "show weight by name")
+
+    assert plot.last_call.source == "model"
+    assert plot.last_call.vega_zero == VEGA_ZERO
+
+
+def test_call_timeout_fallback(table):
+    plot = Plot(
+        model=SlowModel(VEGA_ZERO, delay=0.05),
+        timeout=0.1,
+        fallback=lambda *args, **kwargs: "mark bar encoding x name y aggregate none weight",
+    )
+    plot(table, "show weight by name")
+
+    assert plot.last_call.source == "fallback"
+
+
+def test_call_timeout_without_fallback(table):
+    plot = Plot(model=SlowModel(VEGA_ZERO, delay=0.05), timeout=0.1)
+
+    with pytest.raises(DeadlineExceededError):
+        plot(table, "show weight by name")
+
+
+class CountingModel:
+    def __init__(self, vega_zero: str) -> None:
+        self.vega_zero = vega_zero
+        self.n_calls = 0
+
+    def __call__(self, table: pd.DataFrame, *args, **kwargs) -> str:
+        self.n_calls += 1
+
+        return self.vega_zero
+
+
+def test_call_incremental(table):
+    model = CountingModel(VEGA_ZERO)
+    plot = Plot(model=model, incremental=True)
+
+    plot(table, "show weight by name", chart="bar")
+    plot(table, "show weight by name", chart="line")
+
+    assert model.n_calls == 1
+    assert plot.last_call.source == "patch"
+    assert plot.last_call.vega_zero == (
+        "mark line encoding x name y aggregate none weight transform sort x asc"
+    )
+
+    plot(table, "show weight by name", chart="line", limit=2, sort="desc")
+
+    assert model.n_calls == 1
+    assert plot.last_call.vega_zero == (
+        "mark line encoding x name y aggregate none weight transform sort x desc topk 2"
+    )
+
+
+def test_call_incremental_after_deadline(table):
+    model = SlowModel(VEGA_ZERO, delay=0.02)
+    plot = Plot(model=model, timeout=0.21, incremental=True)
+
+    plot(table, "show weight by name", chart="bar")
+
+    assert plot.last_call.source == "partial"
+
+    # The cut result isn't patched, the model is called again
+    plot.timeout = None
+    plot(table, "show weight by name", chart="bar")
+
+    assert plot.last_call.source == "model"
+    assert plot.last_call.vega_zero == VEGA_ZERO
+
+
+def test_call_incremental_profile(table):
+    model = CountingModel(VEGA_ZERO)
+    plot = Plot(model=model, incremental=True)
+
+    plot(table, "show weight by name", decoding.FAST)
+    plot(table, "show weight by name", decoding.ACCURATE)
+
+    assert model.n_calls == 2
+    assert plot.last_call.source == "model"
+    assert plot.last_call.profile == "accurate"
+
+    plot(table, "show weight by name", decoding.ACCURATE)
+
+    assert model.n_calls == 2
+    assert plot.last_call.source == "patch"
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"chart": "line", "x": "weight"},
+        {"chart": "unknown"},
+        {"color": "not_a_column"},
+    ],
+)
+def test_call_incremental_unsupported(table, kwargs):
+    model = CountingModel(VEGA_ZERO)
+    plot = Plot(model=model, incremental=True)
+
+    plot(table, "show weight by name", chart="bar")
+    plot(table, "show weight by name", **kwargs)
+
+    assert model.n_calls == 2
+    assert plot.last_call.source == "model"
+
+
+def test_call_incremental_table_changed(table):
+    model = CountingModel(VEGA_ZERO)
+    plot = Plot(model=model, incremental=True)
+
+    plot(table, chart="bar")
+    plot(table.assign(Weight=[1, 2, 3]), chart="line")
+
+    assert model.n_calls == 2
+
+
+def test_call_repair(table):
+    plot = Plot(model=lambda *args, **kwargs: VEGA_ZERO.replace("weight", "weights"))
+    plot(table, "show weight by name")
+
+    assert plot.last_call.vega_zero == VEGA_ZERO
+    assert plot.last_call.repairs == [("weights", "weight")]
+
+
+class ProfileModel:
+    def __init__(self) -> None:
+        self.profiles = []
+
+    def __call__(self, table: pd.DataFrame, *args, **kwargs) -> str:
+        self.profiles.append(decoding.current())
+
+        return VEGA_ZERO
+
+
+def test_call_profile(table):
+    model = ProfileModel()
+    plot = Plot(model=model, profile="accurate")
+
+    plot(table, "show weight by name")
+    plot(table, "show weight by name", profile=decoding.FAST)
+    plot(table, decoding.BALANCED, "show weight by name")
+
+    assert model.profiles == [decoding.ACCURATE, decoding.FAST, decoding.BALANCED]
+    assert plot.last_call.profile == "balanced"
+
+    with pytest.raises(InputError):
+        Plot(model=model, profile="unknown")
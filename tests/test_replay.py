@@ -0,0 +1,40 @@
+from pathlib import Path
+
+import pytest
+
+from vxnli.plot import Plot
+from vxnli.replay import SESSIONS_DIR, RecordedModel, load_sessions, replay
+
+
+ROOT_DIR = Path(__file__).parents[1]
+
+
+@pytest.fixture(scope="module")
+def sessions():
+    return load_sessions(ROOT_DIR.joinpath(SESSIONS_DIR))
+
+
+def test_load_sessions(sessions):
+    assert len(sessions) > 0
+
+    for session in sessions:
+        assert len(session.calls) > 0
+        assert all(call.think_time >= 0 for call in session.calls)
+
+
+def test_replay(sessions):
+    sessions = sessions[:2]
+    model = RecordedModel(sessions, prediction_time_scale=0)
+
+    report = replay(
+        sessions,
+        lambda: Plot(model=model, incremental=True),
+        n_users=4,
+        think_time_scale=0,
+    )
+
+    n_calls = 2 * sum(len(session.calls) for session in sessions)
+
+    assert report.n_calls == n_calls
+    assert sum(report.sources.values()) == n_calls - report.n_errors
+    assert report.latency["total"]["p50"] <= report.latency["total"]["max"]
@@ -0,0 +1,179 @@
+import json
+import multiprocessing
+import urllib.request
+
+import pandas as pd
+import pytest
+
+from vxnli.errors import InputError, RoutingError
+from vxnli.plot import Plot
+from vxnli.routing import HashRing, Router
+from vxnli.server import InferenceServer
+
+
+class EchoModel:
+    def __init__(self, name: str = "") -> None:
+        self.name = name
+
+    def __call__(self, table: pd.DataFrame, *args, **kwargs) -> str:
+        if kwargs.get("crash") == self.name:
+            raise RuntimeError("out of memory")
+
+        if kwargs.get("invalid"):
+            raise InputError("invalid")
+
+        # What the models tokenize
+        if kwargs.get("echo"):
+            return json.dumps(
+                [list(map(str, table.dtypes)), table.astype(str).values.tolist()]
+            )
+
+        return f"mark bar encoding x {table.columns[0]} y aggregate none {table.columns[1]}"
+
+
+def _serve(name, queue):
+    server = InferenceServer(EchoModel(name), port=0, name=name)
+    queue.put((name, server.port))
+    server.serve_forever()
+
+
+@pytest.fixture
+def nodes():
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+
+    processes = {}
+
+    for i in range(3):
+        process = ctx.Process(target=_serve, args=(f"node-{i}", queue), daemon=True)
+        process.start()
+        processes[f"node-{i}"] = process
+
+    ports = dict(queue.get(timeout=60) for _ in processes)
+
+    yield {
+        f"http://127.0.0.1:{ports[name]}": process
+        for name, process in processes.items()
+    }
+
+    for process in processes.values():
+        process.terminate()
+        process.join()
+
+
+def test_hash_ring_rebalancing():
+    keys = [f"table-{i}" for i in range(1000)]
+
+    ring = HashRing(["a", "b", "c"])
+    before = {key: ring.nodes(key)[0] for key in keys}
+
+    assert set(before.values()) == {"a", "b", "c"}
+
+    # Only the keys of the removed node move
+    ring.remove("b")
+    after = {key: ring.nodes(key)[0] for key in keys}
+
+    assert all(after[k] == before[k] for k in keys if before[k] != "b")
+    assert "b" not in after.values()
+
+    # Only keys moving to the new node move
+    ring.add("b")
+    ring.add("d")
+    after = {key: ring.nodes(key)[0] for key in keys}
+
+    assert all(after[k] in (before[k], "d") for k in keys)
+    assert 0 < sum(after[k] == "d" for k in keys) < len(keys) / 2
+
+    assert sorted(ring.nodes("table-0")) == ["a", "b", "c", "d"]
+
+
+def test_router(nodes):
+    router = Router(nodes, health_interval=None)
+
+    tables = [
+        pd.DataFrame({"name": ["a", "b"], "value": [1, 2]}),
+        pd.DataFrame({"city": ["x", "y"], "population": [3, 4]}),
+    ]
+
+    for table in tables:
+        vega_zero = router(table, "show a bar chart")
+        node = router.last_node
+
+        assert vega_zero.startswith("mark bar")
+
+        # The same table goes to the same node, and hits its cache
+        assert router(table.copy(), "show a bar chart") == vega_zero
+        assert router.last_node == node
+
+        with urllib.request.urlopen(f"{node}/health") as res:
+            assert json.load(res)["cache_hits"] >= 1
+
+    # Failover to the next node
+    nodes[node].terminate()
+    nodes[node].join()
+
+    assert router(tables[-1], "show a bar chart") == vega_zero
+    assert router.last_node != node
+
+    router.check_health()
+
+    assert node not in router.healthy_nodes
+    assert len(router.healthy_nodes) == 2
+
+    router.remove_node(node)
+    router(tables[-1], "show a bar chart")
+
+    assert router.last_node in router.healthy_nodes
+
+
+def test_router_table(nodes):
+    router = Router(nodes, health_interval=None)
+
+    table = pd.DataFrame(
+        {
+            "zip": ["01234", "02139"],
+            "count": [1, 2],
+            "ratio": [0.1234567890123456, None],
+            "date": pd.to_datetime(["2020-01-01", "2021-02-03"]),
+            "flag": [True, False],
+        }
+    )
+
+    assert router(table, echo=True) == EchoModel()(table, echo=True)
+
+
+def test_router_node_error(nodes):
+    router = Router(nodes, health_interval=None)
+    table = pd.DataFrame({"name": ["a", "b"], "value": [1, 2]})
+
+    router(table, "show a bar chart")
+    node = router.last_node
+
+    with urllib.request.urlopen(f"{node}/health") as res:
+        name = json.load(res)["node"]
+
+    # 5xx fails over, and the node is skipped until it's healthy again
+    assert router(table, "show a bar chart", crash=name).startswith("mark bar")
+    assert router.last_node != node
+    assert node not in router.healthy_nodes
+
+    # 400 is the caller's error
+    with pytest.raises(InputError):
+        router(table, "show a bar chart", invalid=True)
+
+
+def test_router_without_nodes():
+    router = Router(["http://127.0.0.1:9"], health_interval=None)
+
+    with pytest.raises(RoutingError):
+        router(pd.DataFrame({"a": [1], "b": [2]}), "show a bar chart")
+
+
+def test_plot_with_router(nodes):
+    plot = Plot(model=Router(nodes, health_interval=None))
+    table = pd.DataFrame({"name": ["a", "b"], "value": [1, 2]})
+
+    plot(table, "show a bar chart")
+
+    assert plot.last_call.source == "model"
+    assert plot.last_call.vega_zero.startswith("mark bar")
@@ -0,0 +1,60 @@
+from pathlib import Path
+
+import pytest
+
+from vxnli.config import HostConfig
+from vxnli.dataset import DATASET_DIR
+from vxnli.errors import Error
+from vxnli.tune import candidates, measure, synthetic_requests
+
+
+ROOT_DIR = Path(__file__).parents[1]
+
+
+def test_synthetic_requests():
+    requests = synthetic_requests(
+        ROOT_DIR.joinpath(DATASET_DIR, "test.ndjson"), n_requests=16, n_rows=5
+    )
+
+    assert len(requests) == 16
+
+    for table, args, kwargs in requests:
+        assert len(table) == 5
+        assert isinstance(args, tuple)
+        assert isinstance(kwargs, dict)
+
+
+def test_candidates():
+    host_configs = candidates(
+        threads=[1, 2, 4],
+        inter_op_threads=[1],
+        batch_sizes=[1, 8],
+        workers=[1, 2, 4],
+        cpu_count=4,
+    )
+
+    assert all(c.intra_op_threads * c.workers <= 4 for c in host_configs)
+    assert len(host_configs) == 2 * 6
+
+
+def test_synthetic_requests_v0():
+    requests = synthetic_requests(
+        ROOT_DIR.joinpath(DATASET_DIR, "test.ndjson"), n_requests=8, version="v0"
+    )
+
+    assert len(requests) > 0
+
+    for _, args, kwargs in requests:
+        assert len(args) == 1 and isinstance(args[0], str)
+        assert kwargs == {}
+
+
+def test_measure_worker_error(tmp_path):
+    # Fails to load in every worker, measure() raises instead of blocking
+    with pytest.raises(Error):
+        measure(
+            HostConfig(intra_op_threads=1, inter_op_threads=1, batch_size=1, workers=2),
+            [],
+            model_name=tmp_path.joinpath("missing"),
+            timeout=120,
+        )
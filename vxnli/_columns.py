@@ -0,0 +1,197 @@
+"""Repair near-miss column names in a VegaZero
+
+The model sometimes generates a column name close to a real one (e.g. "shop"
+for "shop_id"). ColumnIndex matches an identifier against the columns with
+normalized tokens and character trigrams, and only repairs it when a single
+column is clearly the closest and the spelling is close enough.
+"""
+
+import copy
+import dataclasses
+import functools
+import re
+
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from vxnli._vega_zero import VegaZero
+
+
+# Tokens before these in transform.filter are column names
+_FILTER_OPERATORS = frozenset(
+    ["=", "==", "!=", "<", ">", "<=", ">=", "like", "not", "between"]
+)
+
+# Axis references, not column names
+_AXES = frozenset(["x", "y"])
+
+
+def _normalize(name: str) -> str:
+    return re.sub(r"[^0-9a-z]+", "_", name.lower()).strip("_")
+
+
+def _tokens(name: str) -> FrozenSet[str]:
+    return frozenset(t for t in _normalize(name).split("_") if t != "")
+
+
+def _ngrams(name: str, n: int = 3) -> FrozenSet[str]:
+    name = f"#{_normalize(name).replace('_', '')}#"
+
+    return frozenset(name[i : i + n] for i in range(max(len(name) - n + 1, 1)))
+
+
+def _edit_distance(a: str, b: str) -> int:
+    row = list(range(len(b) + 1))
+
+    for i, ca in enumerate(a, 1):
+        prev, row[0] = row[0], i
+
+        for j, cb in enumerate(b, 1):
+            prev, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, prev + (ca != cb))
+
+    return row[-1]
+
+
+def _close(name: str, column: str) -> bool:
+    """A truncated or extended name, or at most one typo per 8 characters
+
+    Similar n-grams alone accept different words (e.g. "weight" for "height").
+    """
+
+    a, b = _normalize(name).replace("_", ""), _normalize(column).replace("_", "")
+
+    if a.startswith(b) or b.startswith(a):
+        return True
+
+    return _edit_distance(a, b) <= max(len(a), len(b)) // 8
+
+
+def _jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if len(a) == 0 or len(b) == 0:
+        return 0.0
+
+    return len(a & b) / len(a | b)
+
+
+@dataclasses.dataclass
+class ColumnIndex:
+    columns: Tuple[str, ...]
+    threshold: float = 0.5
+
+    def __post_init__(self) -> None:
+        self._exact = frozenset(self.columns)
+        self._normalized: Dict[str, List[str]] = {}
+        self._tokens = [_tokens(col) for col in self.columns]
+        self._ngrams = [_ngrams(col) for col in self.columns]
+        self._postings: Dict[str, Set[int]] = {}
+
+        for i, col in enumerate(self.columns):
+            self._normalized.setdefault(_normalize(col), []).append(col)
+
+            for gram in self._ngrams[i]:
+                self._postings.setdefault(gram, set()).add(i)
+
+            for token in self._tokens[i]:
+                self._postings.setdefault(f"_{token}", set()).add(i)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._exact
+
+    def match(self, name: str) -> Optional[str]:
+        """Return the column name is closest to, or None if unclear"""
+
+        if name in self._exact:
+            return name
+
+        normalized = self._normalized.get(_normalize(name), [])
+
+        if len(normalized) == 1:
+            return normalized[0]
+
+        if len(normalized) > 1:
+            return None
+
+        tokens, ngrams = _tokens(name), _ngrams(name)
+
+        candidates = set()
+
+        for gram in ngrams:
+            candidates |= self._postings.get(gram, set())
+
+        for token in tokens:
+            candidates |= self._postings.get(f"_{token}", set())
+
+        scores = sorted(
+            (
+                max(
+                    _jaccard(tokens, self._tokens[i]),
+                    _jaccard(ngrams, self._ngrams[i]),
+                ),
+                self.columns[i],
+            )
+            for i in candidates
+        )
+
+        if len(scores) == 0 or scores[-1][0] < self.threshold:
+            return None
+
+        if len(scores) > 1 and scores[-2][0] == scores[-1][0]:
+            return None
+
+        if not _close(name, scores[-1][1]):
+            return None
+
+        return scores[-1][1]
+
+
+@functools.lru_cache(maxsize=128)
+def column_index(columns: Tuple[str, ...]) -> ColumnIndex:
+    return ColumnIndex(columns)
+
+
+def repair(
+    vega_zero: VegaZero, columns: Iterable[str]
+) -> Tuple[VegaZero, List[Tuple[str, str]]]:
+    """Replace near-miss column names, returning the (before, after) pairs"""
+
+    index = column_index(tuple(str(col).lower() for col in columns))
+    repairs = []
+
+    def fix(name: Optional[str]) -> Optional[str]:
+        # Multi-word identifiers (e.g. "distinct name") are left as they are
+        if name is None or name in index or name in _AXES or " " in name:
+            return name
+
+        column = index.match(name)
+
+        if column is None:
+            return name
+
+        repairs.append((name, column))
+
+        return column
+
+    vega_zero = copy.deepcopy(vega_zero)
+
+    encoding = vega_zero.encoding
+    encoding.x, encoding.y, encoding.color = map(
+        fix, (encoding.x, encoding.y, encoding.color)
+    )
+
+    transform = vega_zero.transform
+
+    if transform is not None:
+        transform.group = fix(transform.group)
+
+        if transform.sort is not None:
+            transform.sort = (fix(transform.sort[0]), transform.sort[1])
+
+        if transform.filter is not None:
+            tokens = transform.filter.split(" ")
+
+            for i, token in enumerate(tokens[:-1]):
+                if tokens[i + 1] in _FILTER_OPERATORS and token[:1] not in "\"'":
+                    tokens[i] = fix(token)
+
+            transform.filter = " ".join(tokens)
+
+    return vega_zero, repairs
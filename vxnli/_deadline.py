@@ -0,0 +1,85 @@
+"""Per-request time budgets
+
+A deadline is an absolute time.monotonic() value stored in a context variable,
+so Plot can give the model a budget without adding reserved kwargs (every kwarg
+is a user input in V-XNLI).
+
+Models stopping early (at this deadline or at their own timeout) call cut(),
+so the caller knows the output is truncated without guessing from the clock.
+"""
+
+import contextlib
+import time
+
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+
+class _Scope:
+    def __init__(self, deadline: Optional[float], parent: Optional["_Scope"]) -> None:
+        self.deadline = deadline
+        self.parent = parent
+        self.cut = False
+
+
+_SCOPE: ContextVar[Optional[_Scope]] = ContextVar("vxnli_deadline", default=None)
+
+
+def _get() -> Optional[float]:
+    scope = _SCOPE.get()
+
+    return None if scope is None else scope.deadline
+
+
+def current(timeout: Optional[float] = None) -> Optional[float]:
+    """Return the effective deadline, tightened by timeout if given"""
+
+    deadline = _get()
+
+    if timeout is None:
+        return deadline
+
+    if deadline is None:
+        return time.monotonic() + timeout
+
+    return min(deadline, time.monotonic() + timeout)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left until the deadline, None without deadline"""
+
+    deadline = _get()
+
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def expired() -> bool:
+    deadline = _get()
+
+    return deadline is not None and time.monotonic() >= deadline
+
+
+def cut() -> None:
+    """Record that the output was cut short, in every enclosing deadline()"""
+
+    scope = _SCOPE.get()
+
+    while scope is not None:
+        scope.cut = True
+        scope = scope.parent
+
+
+def was_cut() -> bool:
+    scope = _SCOPE.get()
+
+    return scope is not None and scope.cut
+
+
+@contextlib.contextmanager
+def deadline(timeout: Optional[float]) -> Iterator[Optional[float]]:
+    token = _SCOPE.set(_Scope(current(timeout), _SCOPE.get()))
+
+    try:
+        yield _get()
+    finally:
+        _SCOPE.reset(token)
@@ -0,0 +1,22 @@
+import hashlib
+
+import pandas as pd
+
+
+def fingerprint(table: pd.DataFrame) -> str:
+    """Hash the schema and the content of a table"""
+
+    digest = hashlib.blake2b(digest_size=16)
+
+    schema = [(str(col), str(dtype)) for col, dtype in table.dtypes.items()]
+    digest.update(repr(schema).encode())
+
+    try:
+        values = pd.util.hash_pandas_object(table, index=True)
+    except TypeError:
+        # Unhashable cells (e.g. lists)
+        values = pd.util.hash_pandas_object(table.astype(str), index=True)
+
+    digest.update(values.values.tobytes())
+
+    return digest.hexdigest()
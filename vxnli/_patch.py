@@ -0,0 +1,174 @@
+"""Patch a VegaZero with structured kwargs
+
+When only structural kwargs (chart, sort order, limit, color) change between two
+calls on the same table, the previous VegaZero can be edited directly instead
+of running the model again. Anything not recognized here returns None, and the
+caller falls back to the model.
+
+The keys and values are the common ones in data/datasets/vxnli-v1.
+"""
+
+import copy
+
+from typing import Any, Dict, Iterable, Optional
+
+from vxnli._vega_zero import VegaZero, VegaZeroTransform
+
+
+_MARK_KEYS = frozenset(
+    ["chart", "chart_type", "graph", "figure", "plot", "type", "mark", "use", "draw"]
+)
+
+_MARKS = {
+    "bar": "bar",
+    "bars": "bar",
+    "hist": "bar",
+    "histogram": "bar",
+    "line": "line",
+    "point": "point",
+    "scatter": "point",
+    "arc": "arc",
+    "pie": "arc",
+    "circle": "arc",
+}
+
+# None means the axis of the current sort (or y)
+_SORT_KEYS = {
+    "sort": None,
+    "order": None,
+    "sort_order": None,
+    "sorting": None,
+    "sort_values": None,
+    "sort_x": "x",
+    "x_sort": "x",
+    "x_order": "x",
+    "sort_y": "y",
+    "y_sort": "y",
+    "y_order": "y",
+}
+
+_SORT_ORDERS = {
+    "asc": "asc",
+    "ascending": "asc",
+    "low to high": "asc",
+    "low -> high": "asc",
+    "small to big": "asc",
+    "a to z": "asc",
+    "a-z": "asc",
+    "alphabet": "asc",
+    "dictionary": "asc",
+    "desc": "desc",
+    "dsc": "desc",
+    "descending": "desc",
+    "high to low": "desc",
+    "high -> low": "desc",
+    "big to small": "desc",
+    "big -> small": "desc",
+    "z to a": "desc",
+    "z-a": "desc",
+    "reversed dictionary": "desc",
+    "inversed dictionary": "desc",
+}
+
+_TOPK_KEYS = frozenset(
+    ["limit", "limit_results", "topk", "top_k", "topn", "top_n", "top"]
+)
+
+_COLOR_KEYS = frozenset(["color", "colour", "color_by", "color_column", "bar_color"])
+
+
+def _normalize(value: Any) -> str:
+    return str(value).strip().lower()
+
+
+def _patch_mark(vega_zero: VegaZero, value: Any) -> bool:
+    words = _normalize(value).replace("_", " ").split()
+    marks = {_MARKS[w] for w in words if w in _MARKS}
+
+    if len(marks) != 1:
+        return False
+
+    mark = marks.pop()
+
+    if mark == "arc" and vega_zero.transform is not None:
+        if vega_zero.transform.bin is not None:
+            return False
+
+    vega_zero.mark = mark
+
+    return True
+
+
+def _patch_sort(vega_zero: VegaZero, axis: Optional[str], value: Any) -> bool:
+    order = _SORT_ORDERS.get(_normalize(value))
+
+    if order is None:
+        return False
+
+    if vega_zero.transform is None:
+        vega_zero.transform = VegaZeroTransform()
+
+    if axis is None:
+        axis = "y" if vega_zero.transform.sort is None else vega_zero.transform.sort[0]
+
+    vega_zero.transform.sort = (axis, order)
+
+    return True
+
+
+def _patch_topk(vega_zero: VegaZero, value: Any) -> bool:
+    value = _normalize(value)
+
+    if not value.isdigit():
+        return False
+
+    if vega_zero.transform is None:
+        vega_zero.transform = VegaZeroTransform()
+
+    # transform.topk requires transform.sort
+    if vega_zero.transform.sort is None:
+        vega_zero.transform.sort = ("y", "desc")
+
+    vega_zero.transform.topk = int(value)
+
+    return True
+
+
+def _patch_color(vega_zero: VegaZero, columns: Iterable[str], value: Any) -> bool:
+    columns = {col.lower() for col in columns}
+    color = _normalize(value).replace(" ", "_")
+
+    if color not in columns:
+        return False
+
+    vega_zero.encoding.color = color
+
+    return True
+
+
+def patch(
+    vega_zero: VegaZero, columns: Iterable[str], kwargs: Dict[str, Any]
+) -> Optional[VegaZero]:
+    """Apply changed kwargs to a copy of vega_zero, or None if any isn't supported"""
+
+    vega_zero = copy.deepcopy(vega_zero)
+    columns = list(columns)
+
+    for key, value in kwargs.items():
+        key = _normalize(key)
+
+        if key in _MARK_KEYS:
+            patched = _patch_mark(vega_zero, value)
+        elif key in _SORT_KEYS:
+            patched = _patch_sort(vega_zero, _SORT_KEYS[key], value)
+        elif key in _TOPK_KEYS:
+            patched = _patch_topk(vega_zero, value)
+        elif key in _COLOR_KEYS:
+            patched = _patch_color(vega_zero, columns, value)
+        else:
+            patched = False
+
+        if not patched:
+            return None
+
+    return vega_zero
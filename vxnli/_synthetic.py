@@ -0,0 +1,41 @@
+"""Random tables with the columns a VegaZero uses
+
+For benchmarks and load tests, when the original tables aren't available.
+"""
+
+import random
+
+from typing import Iterable, List
+
+import pandas as pd
+
+from vxnli._columns import _FILTER_OPERATORS
+from vxnli._vega_zero import VegaZero
+
+
+_WORDS = ["alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel"]
+
+
+def columns(vega_zero: VegaZero) -> List[str]:
+    names = [vega_zero.encoding.x, vega_zero.encoding.y, vega_zero.encoding.color]
+
+    if vega_zero.transform is not None and vega_zero.transform.filter is not None:
+        tokens = vega_zero.transform.filter.split()
+        names += [t for t, o in zip(tokens, tokens[1:]) if o in _FILTER_OPERATORS]
+
+    # e.g. "distinct name"
+    names = (name.split()[-1] for name in names if name is not None)
+
+    return list(dict.fromkeys(names))
+
+
+def table(names: Iterable[str], n_rows: int, rand: random.Random) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            name: [
+                rand.choice(_WORDS) if i % 2 == 0 else rand.randint(0, 1000)
+                for _ in range(n_rows)
+            ]
+            for i, name in enumerate(names)
+        }
+    )
@@ -88,10 +88,16 @@ class VegaZeroTransform:
         if "sort" in kwargs:
             kwargs["sort"] = tuple(kwargs["sort"].rsplit(maxsplit=1))
 
+            if len(kwargs["sort"]) == 0:
+                raise VegaZeroError("Empty transform.sort")
+
             if len(kwargs["sort"]) == 1:
                 kwargs["sort"] = (kwargs["sort"][0], "asc")
 
         if "topk" in kwargs:
+            if not kwargs["topk"].isdigit():
+                raise VegaZeroError(f"Invalid transform.topk: {kwargs['topk']}")
+
             kwargs["topk"] = int(kwargs["topk"])
 
         return kwargs
@@ -0,0 +1,176 @@
+import argparse
+import dataclasses
+import json
+import logging
+
+from pathlib import Path
+from typing import List, Optional
+
+from vxnli.dataset import DATASET_DIR
+
+
+def _ints(value: str) -> List[int]:
+    return [int(v) for v in value.split(",")]
+
+
+def tune(args: argparse.Namespace) -> None:
+    from vxnli import tune
+
+    path = tune.run(
+        model_name=args.model,
+        version=args.version,
+        dataset_path=args.dataset,
+        n_requests=args.requests,
+        threads=args.threads,
+        inter_op_threads=args.inter_op_threads,
+        batch_sizes=args.batch_sizes,
+        workers=args.workers,
+        max_p95=args.max_p95,
+        output=args.output,
+    )
+
+    if path is None:
+        raise SystemExit(1)
+
+    print(f"Saved {path}")
+
+
+def replay(args: argparse.Namespace) -> None:
+    from vxnli import replay
+    from vxnli.plot import Plot
+
+    sessions = replay.load_sessions(args.sessions)
+
+    if args.model is None:
+        model = replay.RecordedModel(sessions, args.prediction_time_scale)
+    elif args.version == "v0":
+        from vxnli.models.v0.model import Model
+
+        model = Model(args.model)
+    else:
+        from vxnli.models.v1.model import Model
+
+        model = Model(args.model)
+
+    def plot_factory() -> Plot:
+        return Plot(
+            model=model,
+            timeout=args.timeout,
+            incremental=args.incremental,
+            profile=args.profile,
+        )
+
+    report = replay.replay(
+        sessions,
+        plot_factory,
+        n_users=args.users,
+        think_time_scale=args.think_time_scale,
+        max_think_time=args.max_think_time,
+    )
+
+    print(json.dumps(dataclasses.asdict(report), indent=2))
+
+
+def serve(args: argparse.Namespace) -> None:
+    from vxnli import server
+
+    server.run(
+        huggingface_model=args.model,
+        version=args.version,
+        host=args.host,
+        port=args.port,
+        name=args.name,
+        cache_size=args.cache_size,
+        workers=args.workers,
+    )
+
+
+def export(args: argparse.Namespace) -> None:
+    from vxnli.models import artifact
+
+    print(f"Saved {artifact.export(args.model, args.output_dir)}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="vxnli")
+    subparsers = parser.add_subparsers(required=True)
+
+    parser_tune = subparsers.add_parser(
+        "tune", help="Find the torch threads, batch size and workers for this host"
+    )
+    parser_tune.add_argument("--model", default="kwkty/vxnli-v1")
+    parser_tune.add_argument("--version", default="v1", choices=["v0", "v1"])
+    parser_tune.add_argument(
+        "--dataset", type=Path, default=DATASET_DIR.joinpath("test.ndjson")
+    )
+    parser_tune.add_argument("--requests", type=int, default=64)
+    parser_tune.add_argument("--threads", type=_ints, help="e.g. 1,2,4")
+    parser_tune.add_argument("--inter-op-threads", type=_ints, help="e.g. 1,2")
+    parser_tune.add_argument("--batch-sizes", type=_ints, help="e.g. 1,4,8")
+    parser_tune.add_argument("--workers", type=_ints, help="e.g. 1,2,4")
+    parser_tune.add_argument(
+        "--max-p95", type=float, help="Latency limit in seconds per request"
+    )
+    parser_tune.add_argument(
+        "--output", type=Path, help="Defaults to $VXNLI_CONFIG or ~/.config/vxnli/"
+    )
+    parser_tune.set_defaults(func=tune)
+
+    parser_replay = subparsers.add_parser(
+        "replay", help="Replay the user-study sessions as a load test against Plot"
+    )
+    parser_replay.add_argument(
+        "--sessions", type=Path, default=Path("data/results/user-study/tasks")
+    )
+    parser_replay.add_argument(
+        "--model", help="Hub name or artifact path. Defaults to the recorded answers"
+    )
+    parser_replay.add_argument("--version", default="v1", choices=["v0", "v1"])
+    parser_replay.add_argument("--users", type=int, default=16)
+    parser_replay.add_argument(
+        "--think-time-scale", type=float, default=1.0, help="0 for no breaks"
+    )
+    parser_replay.add_argument("--max-think-time", type=float)
+    parser_replay.add_argument(
+        "--prediction-time-scale",
+        type=float,
+        default=1.0,
+        help="For the recorded answers",
+    )
+    parser_replay.add_argument("--timeout", type=float)
+    parser_replay.add_argument("--incremental", action="store_true")
+    parser_replay.add_argument("--profile", choices=["fast", "balanced", "accurate"])
+    parser_replay.set_defaults(func=replay)
+
+    parser_serve = subparsers.add_parser(
+        "serve", help="Run an inference node for vxnli.routing.Router"
+    )
+    parser_serve.add_argument("--model", default="kwkty/vxnli-v1")
+    parser_serve.add_argument("--version", default="v1", choices=["v0", "v1"])
+    parser_serve.add_argument("--host", default="127.0.0.1")
+    parser_serve.add_argument("--port", type=int, default=8000)
+    parser_serve.add_argument("--name")
+    parser_serve.add_argument("--cache-size", type=int, default=1024)
+    parser_serve.add_argument(
+        "--workers",
+        type=int,
+        help="Nodes on consecutive ports, defaults to the tuned count",
+    )
+    parser_serve.set_defaults(func=serve)
+
+    parser_export = subparsers.add_parser(
+        "export", help="Export a pre-built model artifact"
+    )
+    parser_export.add_argument("model")
+    parser_export.add_argument("output_dir", type=Path)
+    parser_export.set_defaults(func=export)
+
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
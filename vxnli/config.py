@@ -0,0 +1,78 @@
+"""Host settings written by `vxnli tune`
+
+The models apply the thread counts at start-up, and `vxnli serve` starts the
+tuned number of workers. batch_size is advisory: Plot and the inference nodes
+predict one request at a time, it's for callers of Model.batch. The path can be
+changed with VXNLI_CONFIG.
+"""
+
+import dataclasses
+import json
+import logging
+import os
+
+from pathlib import Path
+from typing import Optional, Union
+
+
+logger = logging.getLogger(__name__)
+
+
+def default_path() -> Path:
+    path = os.environ.get("VXNLI_CONFIG")
+
+    if path is not None:
+        return Path(path)
+
+    return Path.home().joinpath(".config/vxnli/config.json")
+
+
+@dataclasses.dataclass
+class HostConfig:
+    # None keeps the torch defaults
+    intra_op_threads: Optional[int] = None
+    inter_op_threads: Optional[int] = None
+    # Advisory, for callers of Model.batch
+    batch_size: int = 1
+    # Processes started by `vxnli serve`
+    workers: int = 1
+
+
+def load(path: Union[str, Path, None] = None) -> HostConfig:
+    path = default_path() if path is None else Path(path)
+
+    if not path.exists():
+        return HostConfig()
+
+    with open(path) as f:
+        config = json.load(f)
+
+    fields = {field.name for field in dataclasses.fields(HostConfig)}
+
+    return HostConfig(**{k: v for k, v in config.items() if k in fields})
+
+
+def save(config: HostConfig, path: Union[str, Path, None] = None, **extra) -> Path:
+    """Write config, plus extra keys (e.g. measurements) that load() ignores"""
+
+    path = default_path() if path is None else Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(path, "w") as f:
+        json.dump({**dataclasses.asdict(config), **extra}, f, indent=2)
+
+    return path
+
+
+def apply(config: HostConfig) -> None:
+    import torch
+
+    if config.intra_op_threads is not None:
+        torch.set_num_threads(config.intra_op_threads)
+
+    if config.inter_op_threads is not None:
+        try:
+            torch.set_num_interop_threads(config.inter_op_threads)
+        except RuntimeError:
+            # It can only be set once, before any inter-op parallel work
+            logger.warning("torch inter-op threads are already set, ignored")
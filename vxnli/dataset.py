@@ -0,0 +1,333 @@
+"""Preprocessed and tokenized vxnli-v1 datasets
+
+The training notebooks tokenized every example on each run.
+build_dataset streams data/datasets/vxnli-v1/{split}.ndjson, preprocesses the
+examples the same way as the v1 model does at inference, tokenizes them in
+worker processes, and writes sharded .npy token arrays. The shards are reused
+(memory-mapped) as long as the input file, the tokenizer and the preprocessing
+are the same.
+
+Tables are loaded from the nvBench databases (see README.md).
+"""
+
+import bisect
+import collections
+import functools
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import shutil
+import sqlite3
+
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+
+DATASET_DIR = Path("data/datasets/vxnli-v1")
+DATABASE_DIR = Path("data/datasets/nvBench/database")
+CACHE_DIR = Path("data/datasets/vxnli-v1.cache")
+
+# Bump when the preprocessing or the shard format changes
+PREPROCESS_VERSION = 1
+
+MAX_SOURCE_LENGTH = 1024
+MAX_TARGET_LENGTH = 124
+
+_TOKENIZER_FILES = [
+    "added_tokens.json",
+    "merges.txt",
+    "special_tokens_map.json",
+    "tokenizer_config.json",
+    "vocab.json",
+]
+
+
+def iter_examples(path: Union[str, Path]) -> Iterator[Dict[str, Any]]:
+    with open(path) as f:
+        for line in f:
+            if line.strip() != "":
+                yield json.loads(line)
+
+
+def load_table(
+    db_id: str, table_name: str, database_dir: Union[str, Path] = DATABASE_DIR
+) -> pd.DataFrame:
+    db_path = Path(database_dir).joinpath(f"{db_id}/{db_id}.sqlite")
+
+    with sqlite3.connect(db_path) as con:
+        return pd.read_sql(f"SELECT * FROM {table_name}", con)
+
+
+def _file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+
+    with open(path, "rb") as f:
+        for chunk in iter(functools.partial(f.read, 1 << 20), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def _tokenizer_digest(tokenizer: Union[str, Path]) -> str:
+    # Hub names are used as they are. Local tokenizers are keyed by their files.
+    if not Path(tokenizer).is_dir():
+        return str(tokenizer)
+
+    files = (Path(tokenizer).joinpath(name) for name in _TOKENIZER_FILES)
+
+    return ",".join(_file_digest(f) for f in files if f.exists())
+
+
+def _cache_key(path: Path, tokenizer: Union[str, Path], **params: Any) -> str:
+    key = {
+        "input": _file_digest(path),
+        "tokenizer": _tokenizer_digest(tokenizer),
+        "preprocess_version": PREPROCESS_VERSION,
+        **params,
+    }
+    key = json.dumps(key, sort_keys=True)
+
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+
+def _chunks(iterable: Iterator, size: int) -> Iterator[List]:
+    while True:
+        chunk = list(itertools.islice(iterable, size))
+
+        if len(chunk) == 0:
+            return
+
+        yield chunk
+
+
+def _concat(sequences: List[List[int]]) -> Tuple[np.ndarray, np.ndarray]:
+    offsets = np.zeros(len(sequences) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(s) for s in sequences])
+
+    values = np.fromiter(itertools.chain.from_iterable(sequences), dtype=np.int32)
+
+    return values, offsets
+
+
+def write_shard(
+    path: Union[str, Path], input_ids: List[List[int]], labels: List[List[int]]
+) -> None:
+    """Write ragged token sequences as flat arrays plus offsets"""
+
+    for name, sequences in [("input_ids", input_ids), ("labels", labels)]:
+        values, offsets = _concat(sequences)
+
+        np.save(f"{path}.{name}.npy", values)
+        np.save(f"{path}.{name}_offsets.npy", offsets)
+
+
+# Per worker process state
+_TOKENIZER = None
+
+
+def _init_worker(tokenizer: Union[str, Path]) -> None:
+    from transformers import TapexTokenizer
+
+    global _TOKENIZER
+
+    _TOKENIZER = TapexTokenizer.from_pretrained(tokenizer)
+
+
+@functools.lru_cache(maxsize=None)
+def _load_and_preprocess_table(
+    db_id: str, table_name: str, database_dir: str
+) -> pd.DataFrame:
+    from vxnli.models.v1.model import Model
+
+    return Model._preprocess_table(load_table(db_id, table_name, database_dir))
+
+
+def _tokenize_shard(
+    shard_path: str,
+    examples: List[Dict[str, Any]],
+    database_dir: str,
+    max_source_length: int,
+    max_target_length: int,
+) -> int:
+    from vxnli.models.v1.model import Model
+
+    input_ids, labels = [], []
+
+    for example in examples:
+        table = _load_and_preprocess_table(
+            example["db_id"], example["table"], database_dir
+        )
+
+        query = Model._preprocess_args(*example["args"], **example["kwargs"])
+
+        encoding = _TOKENIZER(
+            table=table,
+            query=query,
+            max_length=max_source_length,
+            truncation=True,
+        )
+
+        label = _TOKENIZER(
+            answer=example["vega_zero"],
+            max_length=max_target_length,
+            truncation=True,
+        )
+
+        input_ids.append(encoding["input_ids"])
+        labels.append(label["input_ids"])
+
+    write_shard(shard_path, input_ids, labels)
+
+    return len(examples)
+
+
+class TokenizedDataset:
+    """Memory-mapped shards written by build_dataset
+
+    Items are dicts of input_ids, attention_mask and labels, so the dataset can
+    be given to Seq2SeqTrainer with DataCollatorForSeq2Seq as it is.
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+
+        with open(self.path.joinpath("manifest.json")) as f:
+            self.manifest = json.load(f)
+
+        self._shards = []
+
+        for shard in self.manifest["shards"]:
+            shard_path = self.path.joinpath(shard["name"])
+
+            self._shards.append(
+                {
+                    name: np.load(f"{shard_path}.{name}.npy", mmap_mode="r")
+                    for name in [
+                        "input_ids",
+                        "input_ids_offsets",
+                        "labels",
+                        "labels_offsets",
+                    ]
+                }
+            )
+
+        self._ends = list(
+            itertools.accumulate(shard["size"] for shard in self.manifest["shards"])
+        )
+
+    def __len__(self) -> int:
+        return self._ends[-1] if len(self._ends) > 0 else 0
+
+    def __getitem__(self, i: int) -> Dict[str, List[int]]:
+        if i < 0:
+            i += len(self)
+
+        if not 0 <= i < len(self):
+            raise IndexError(f"index out of range: {i}")
+
+        shard_i = bisect.bisect_right(self._ends, i)
+        shard = self._shards[shard_i]
+
+        j = i - (self._ends[shard_i - 1] if shard_i > 0 else 0)
+
+        item = {}
+
+        for name in ["input_ids", "labels"]:
+            start, end = shard[f"{name}_offsets"][j : j + 2]
+            item[name] = shard[name][start:end].tolist()
+
+        item["attention_mask"] = [1] * len(item["input_ids"])
+
+        return item
+
+
+def build_dataset(
+    split: str,
+    tokenizer: Union[str, Path] = "kwkty/vxnli-v1",
+    dataset_dir: Union[str, Path] = DATASET_DIR,
+    database_dir: Union[str, Path] = DATABASE_DIR,
+    cache_dir: Union[str, Path] = CACHE_DIR,
+    shard_size: int = 256,
+    num_workers: Optional[int] = None,
+    max_source_length: int = MAX_SOURCE_LENGTH,
+    max_target_length: int = MAX_TARGET_LENGTH,
+) -> TokenizedDataset:
+    """Tokenize {split}.ndjson, or load the cached shards if they're up to date"""
+
+    path = Path(dataset_dir).joinpath(f"{split}.ndjson")
+
+    key = _cache_key(
+        path,
+        tokenizer,
+        max_source_length=max_source_length,
+        max_target_length=max_target_length,
+    )
+
+    output_dir = Path(cache_dir).joinpath(f"{split}-{key}")
+
+    if output_dir.joinpath("manifest.json").exists():
+        return TokenizedDataset(output_dir)
+
+    # Write to a temporary directory and rename it, so that a killed build
+    # doesn't leave a partial cache behind
+    tmp_dir = Path(cache_dir).joinpath(f".{split}-{key}.{os.getpid()}")
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+
+    tasks = (
+        (
+            str(tmp_dir.joinpath(f"shard-{i:05d}")),
+            examples,
+            str(database_dir),
+            max_source_length,
+            max_target_length,
+        )
+        for i, examples in enumerate(_chunks(iter_examples(path), shard_size))
+    )
+
+    # Pool.imap/starmap read the whole input ahead, so submit the chunks as
+    # shards finish, keeping a few of them in memory at a time
+    window = 2 * (num_workers or os.cpu_count() or 1)
+    pending, sizes = collections.deque(), []
+
+    try:
+        with multiprocessing.Pool(
+            num_workers, initializer=_init_worker, initargs=(tokenizer,)
+        ) as pool:
+            for task in tasks:
+                pending.append(pool.apply_async(_tokenize_shard, task))
+
+                if len(pending) >= window:
+                    sizes.append(pending.popleft().get())
+
+            while len(pending) > 0:
+                sizes.append(pending.popleft().get())
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    manifest = {
+        "split": split,
+        "tokenizer": str(tokenizer),
+        "preprocess_version": PREPROCESS_VERSION,
+        "max_source_length": max_source_length,
+        "max_target_length": max_target_length,
+        "shards": [
+            {"name": f"shard-{i:05d}", "size": size} for i, size in enumerate(sizes)
+        ],
+    }
+
+    with open(tmp_dir.joinpath("manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    try:
+        tmp_dir.rename(output_dir)
+    except OSError:
+        # Built by another process in the meantime
+        shutil.rmtree(tmp_dir)
+
+    return TokenizedDataset(output_dir)
@@ -0,0 +1,77 @@
+"""Decoding profiles to trade accuracy for latency
+
+Plot and the models take a profile by name or as a DecodingProfile. Passing a
+DecodingProfile anywhere in the Plot arguments overrides it for that call only.
+
+benchmarks/decoding_profiles.py measures the latency and exact match of each
+profile on data/datasets/vxnli-v1/test.ndjson, and the VegaZero token lengths.
+"""
+
+import contextlib
+import dataclasses
+
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional, Union
+
+from vxnli.errors import InputError
+
+
+@dataclasses.dataclass(frozen=True)
+class DecodingProfile:
+    name: str
+    num_beams: int
+    max_new_tokens: int
+
+    def generate_kwargs(self) -> Dict[str, Any]:
+        return {
+            "num_beams": self.num_beams,
+            "max_new_tokens": self.max_new_tokens,
+            "do_sample": False,
+            "early_stopping": self.num_beams > 1,
+        }
+
+
+# The VegaZero of vxnli-v1 are at most 50 tokens (p99 43, see
+# benchmarks/decoding_profiles.md). 64 cuts runaway greedy decodes early.
+FAST = DecodingProfile("fast", num_beams=1, max_new_tokens=64)
+
+# 128 tokens is above the training target length (124)
+BALANCED = DecodingProfile("balanced", num_beams=2, max_new_tokens=128)
+ACCURATE = DecodingProfile("accurate", num_beams=4, max_new_tokens=128)
+
+PROFILES = {profile.name: profile for profile in [FAST, BALANCED, ACCURATE]}
+
+
+_PROFILE: ContextVar[Optional[DecodingProfile]] = ContextVar(
+    "vxnli_decoding_profile", default=None
+)
+
+
+def get(profile: Union[str, DecodingProfile, None]) -> Optional[DecodingProfile]:
+    if profile is None or isinstance(profile, DecodingProfile):
+        return profile
+
+    if profile not in PROFILES:
+        raise InputError(f"Unknown decoding profile: {profile}")
+
+    return PROFILES[profile]
+
+
+def current(
+    default: Union[str, DecodingProfile, None] = None
+) -> Optional[DecodingProfile]:
+    """Return the profile of the current Plot call, or default"""
+
+    profile = _PROFILE.get()
+
+    return get(default) if profile is None else profile
+
+
+@contextlib.contextmanager
+def using(profile: Union[str, DecodingProfile, None]) -> Iterator[None]:
+    token = _PROFILE.set(get(profile))
+
+    try:
+        yield
+    finally:
+        _PROFILE.reset(token)
@@ -8,3 +8,11 @@ class InputError(Error):
 
 class VegaZeroError(Error):
     pass
+
+
+class DeadlineExceededError(Error):
+    pass
+
+
+class RoutingError(Error):
+    pass
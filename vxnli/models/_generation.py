@@ -0,0 +1,39 @@
+import time
+
+from typing import Optional
+
+import torch
+
+from transformers import StoppingCriteria, StoppingCriteriaList
+
+from vxnli import _deadline
+
+
+class DeadlineCriteria(StoppingCriteria):
+    """Stop decoding once the deadline passes
+
+    generate() then finalizes the beams decoded so far instead of blocking.
+    The output is reported as cut (vxnli._deadline.was_cut) for the caller.
+    """
+
+    def __init__(self, deadline: float) -> None:
+        self.deadline = deadline
+
+    def __call__(
+        self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs
+    ) -> bool:
+        if time.monotonic() < self.deadline:
+            return False
+
+        _deadline.cut()
+
+        return True
+
+
+def stopping_criteria(timeout: Optional[float] = None) -> StoppingCriteriaList:
+    deadline = _deadline.current(timeout)
+
+    if deadline is None:
+        return StoppingCriteriaList()
+
+    return StoppingCriteriaList([DeadlineCriteria(deadline)])
@@ -0,0 +1,183 @@
+"""Pre-built model artifacts for fast start-up
+
+from_pretrained() resolves the checkpoint on the hub and deserializes it into
+fresh memory on every process start. export() writes a local directory with the
+tokenizer and safetensors weights instead. load() memory-maps the weights, so
+the pages are shared by every process on the host, and never touches the network.
+(safetensors 0.2.x already backs the torch tensors by the file mapping, with
+torch.ByteStorage.from_file, the tensors aren't copies.)
+
+    python -m vxnli.models.artifact kwkty/vxnli-v1 data/models/vxnli-v1
+"""
+
+import argparse
+import json
+
+from pathlib import Path
+from typing import Dict, List, Tuple, Union
+
+import torch
+
+from torch.overrides import TorchFunctionMode
+from safetensors import safe_open
+from safetensors.torch import save_file
+from transformers import BartConfig, BartForConditionalGeneration, TapexTokenizer
+
+from vxnli.errors import Error
+
+
+MANIFEST_FILE = "vxnli-artifact.json"
+WEIGHTS_FILE = "model.safetensors"
+
+
+def is_artifact(path: Union[str, Path]) -> bool:
+    return Path(path).joinpath(MANIFEST_FILE).exists()
+
+
+def _split_tied(
+    state_dict: Dict[str, torch.Tensor]
+) -> Tuple[Dict[str, torch.Tensor], Dict[str, List[str]]]:
+    # safetensors doesn't store shared tensors (e.g. BART ties the embeddings
+    # and lm_head), so save one of them and record the others as aliases
+    tensors, aliases, names = {}, {}, {}
+
+    for name, tensor in state_dict.items():
+        key = (tensor.data_ptr(), tuple(tensor.shape), tensor.dtype)
+
+        if key in names:
+            aliases[names[key]].append(name)
+        else:
+            names[key] = name
+            tensors[name] = tensor.contiguous()
+            aliases[name] = []
+
+    return tensors, {k: v for k, v in aliases.items() if len(v) > 0}
+
+
+def export(huggingface_model: Union[str, Path], output_dir: Union[str, Path]) -> Path:
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    tokenizer = TapexTokenizer.from_pretrained(huggingface_model)
+    model = BartForConditionalGeneration.from_pretrained(huggingface_model)
+
+    tokenizer.save_pretrained(output_dir)
+    model.config.save_pretrained(output_dir)
+
+    tensors, aliases = _split_tied(model.state_dict())
+    save_file(tensors, str(output_dir.joinpath(WEIGHTS_FILE)))
+
+    # Written last, so an interrupted export isn't taken as an artifact
+    with open(output_dir.joinpath(MANIFEST_FILE), "w") as f:
+        json.dump({"source": str(huggingface_model), "aliases": aliases}, f, indent=2)
+
+    return output_dir
+
+
+# Functions allocating the parameters and buffers of torch.nn modules
+_FACTORIES = frozenset(
+    [
+        torch.empty,
+        torch.zeros,
+        torch.ones,
+        torch.full,
+        torch.rand,
+        torch.randn,
+        torch.arange,
+        torch.tensor,
+    ]
+)
+
+
+class _MetaDevice(TorchFunctionMode):
+    """torch.device("meta") as a context manager, which torch<2.0 lacks"""
+
+    def __torch_function__(self, func, types, args=(), kwargs=None):
+        kwargs = {} if kwargs is None else kwargs
+
+        if func in _FACTORIES and kwargs.get("device") is None:
+            kwargs["device"] = "meta"
+
+        return func(*args, **kwargs)
+
+
+def _empty_model(config: BartConfig) -> BartForConditionalGeneration:
+    # The weights are replaced right after construction, so allocate and
+    # initialize nothing. Function modes only apply to this thread, unlike
+    # patching torch.nn.init.
+    meta = torch.device("meta")
+
+    with (meta if hasattr(meta, "__enter__") else _MetaDevice()):
+        return BartForConditionalGeneration(config)
+
+
+def _get_module(model: torch.nn.Module, name: str) -> Tuple[torch.nn.Module, str]:
+    module_name, _, attr = name.rpartition(".")
+
+    return model.get_submodule(module_name), attr
+
+
+def _set_tensor(model: torch.nn.Module, name: str, tensor: torch.Tensor) -> None:
+    module, attr = _get_module(model, name)
+
+    if attr in module._parameters:
+        module._parameters[attr] = tensor
+    else:
+        module._buffers[attr] = tensor
+
+
+def load(path: Union[str, Path]) -> Tuple[TapexTokenizer, BartForConditionalGeneration]:
+    path = Path(path)
+
+    with open(path.joinpath(MANIFEST_FILE)) as f:
+        aliases = json.load(f)["aliases"]
+
+    tokenizer = TapexTokenizer.from_pretrained(path, local_files_only=True)
+    config = BartConfig.from_pretrained(path, local_files_only=True)
+
+    model = _empty_model(config)
+
+    loaded = set()
+
+    # safe_open memory-maps the file, the tensors are views of the mapping
+    with safe_open(str(path.joinpath(WEIGHTS_FILE)), framework="pt") as f:
+        for name in f.keys():
+            targets = [name, *aliases.get(name, [])]
+
+            tensor = f.get_tensor(name)
+            module, attr = _get_module(model, name)
+
+            # Aliases get the same Parameter to stay tied
+            if attr in module._parameters:
+                tensor = torch.nn.Parameter(tensor, requires_grad=False)
+
+            for target in targets:
+                _set_tensor(model, target, tensor)
+
+            loaded.update(targets)
+
+    # Non-persistent buffers aren't in the state dict, but stay on meta too
+    missing = sorted(model.state_dict().keys() - loaded) + [
+        name for name, buffer in model.named_buffers() if buffer.is_meta
+    ]
+
+    if len(missing) > 0:
+        raise Error(f"{path} has no weights for {', '.join(missing)}")
+
+    model.eval()
+
+    return tokenizer, model
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export a pre-built model artifact")
+    parser.add_argument("huggingface_model")
+    parser.add_argument("output_dir")
+
+    args = parser.parse_args()
+
+    export(args.huggingface_model, args.output_dir)
+
+
+if __name__ == "__main__":
+    main()
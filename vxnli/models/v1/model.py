@@ -1,7 +1,7 @@
 import warnings
 
 from pathlib import Path
-from typing import Union
+from typing import List, Optional, Sequence, Tuple, Union
 
 import pandas as pd
 
@@ -10,42 +10,76 @@ from transformers import (
     TapexTokenizer,
 )
 
+from vxnli import config, decoding
+from vxnli.config import HostConfig
+from vxnli.decoding import DecodingProfile
+from vxnli.models import artifact
+from vxnli.models._generation import stopping_criteria
+
 
 class Model:
-    def __init__(self, huggingface_model: Union[str, Path] = "kwkty/vxnli-v1") -> None:
-        self.tokenizer = TapexTokenizer.from_pretrained(huggingface_model)
-        self.model = BartForConditionalGeneration.from_pretrained(huggingface_model)
+    def __init__(
+        self,
+        huggingface_model: Union[str, Path] = "kwkty/vxnli-v1",
+        timeout: Optional[float] = None,
+        profile: Union[str, DecodingProfile, None] = None,
+        host_config: Optional[HostConfig] = None,
+    ) -> None:
+        # Seconds allowed for generate(). Decoding stops early and returns the
+        # sequence decoded so far, which Plot handles as cut by its deadline.
+        self.timeout = timeout
+
+        # None keeps the generation config of the checkpoint
+        self.profile = decoding.get(profile)
+
+        # Thread settings written by `vxnli tune` by default
+        self.host_config = config.load() if host_config is None else host_config
+        config.apply(self.host_config)
+
+        # A directory written by vxnli.models.artifact.export loads memory-mapped
+        if artifact.is_artifact(huggingface_model):
+            self.tokenizer, self.model = artifact.load(huggingface_model)
+        else:
+            self.tokenizer = TapexTokenizer.from_pretrained(huggingface_model)
+            self.model = BartForConditionalGeneration.from_pretrained(huggingface_model)
 
     def __call__(self, table: pd.DataFrame, *args, **kwargs) -> str:
-        query = self._preprocess_args(*args, **kwargs)
+        return self.batch([(table, args, kwargs)])[0]
 
-        table = table.copy()
-        table = self._preprocess_table(table)
+    def batch(self, requests: Sequence[Tuple[pd.DataFrame, Tuple, dict]]) -> List[str]:
+        queries = [
+            self._preprocess_args(*args, **kwargs) for _, args, kwargs in requests
+        ]
+        tables = [self._preprocess_table(table.copy()) for table, _, _ in requests]
 
         encoding = self.tokenizer(
-            table=table,
-            query=query,
+            table=tables,
+            query=queries,
             max_length=1024,
             padding=True,
             truncation=True,
             return_tensors="pt",
         )
 
+        profile = decoding.current(self.profile)
+        generate_kwargs = {} if profile is None else profile.generate_kwargs()
+
         with warnings.catch_warnings():
             # Disable warning below
             # UserWarning: Neither `max_length` nor `max_new_tokens` has been set, `max_length` will default to 1024 (`self.config.max_length`). Controlling `max_length` via the config is deprecated and `max_length` will be removed from the config in v5 of Transformers -- we recommend using `max_new_tokens` to control the maximum length of the generation.
             warnings.filterwarnings("ignore", category=UserWarning)
-            output = self.model.generate(**encoding)
+            output = self.model.generate(
+                **encoding,
+                **generate_kwargs,
+                stopping_criteria=stopping_criteria(self.timeout),
+            )
 
         output = self.tokenizer.batch_decode(
             output, skip_special_tokens=True, clean_up_tokenization_spaces=True
         )
-        output = output[0]
 
         # Tokenizer might use add_prefix_space=True
-        output = output.strip()
-
-        return output
+        return [o.strip() for o in output]
 
     @staticmethod
     def _preprocess_args(*args, **kwargs) -> str:
@@ -1,37 +1,277 @@
+import dataclasses
 import logging
+import time
 
-from typing import Callable, Optional, Tuple
+from typing import Any, Callable, List, Optional, Tuple, Union
 
 import altair as alt
 import pandas as pd
 
-from vxnli._vega_zero import VegaZero
-from vxnli.errors import InputError
+from vxnli import _deadline, decoding
+from vxnli._columns import repair
+from vxnli._fingerprint import fingerprint
+from vxnli._patch import patch
+from vxnli._vega_zero import VegaZero, VegaZeroTransform
+from vxnli.decoding import DecodingProfile
+from vxnli.errors import DeadlineExceededError, InputError, VegaZeroError
 
 
 logger = logging.getLogger(__name__)
 
 
+# Keywords starting a transform clause
+_TRANSFORM_KEYWORDS = frozenset(
+    field.name for field in dataclasses.fields(VegaZeroTransform)
+)
+
+
+@dataclasses.dataclass
+class CallRecord:
+    """What served the last Plot call and how long it took
+
+    source is one of:
+    - "model": the model output
+    - "partial": the complete clauses of an output cut by the deadline
+    - "fallback": the fallback output after the deadline
+    - "patch": the previous VegaZero patched with changed kwargs (incremental)
+
+    repairs lists the (generated, actual) column names fixed in the VegaZero.
+    profile is the name of the decoding profile given to the model, if any.
+    """
+
+    vega_zero: str
+    source: str
+    prediction_time: float
+    rendering_time: float
+    total_time: float
+    repairs: List[Tuple[str, str]] = dataclasses.field(default_factory=list)
+    profile: Optional[str] = None
+
+
+@dataclasses.dataclass
+class _Session:
+    fingerprint: str
+    profile: Optional[str]
+    args: Tuple
+    kwargs: dict
+    vega_zero: VegaZero
+
+
+def _equals(a: Any, b: Any) -> bool:
+    try:
+        return bool(a == b)
+    except (TypeError, ValueError):
+        # e.g. numpy arrays
+        return False
+
+
+def _parse_partial(vega_zero_str: str) -> Optional[VegaZero]:
+    """Parse the complete clauses of an output cut by the deadline
+
+    The last token might be cut (e.g. "wei" for "weight"), so the encoding is
+    used only if the transform was started, and the transform clause being
+    generated (e.g. "topk 1" for "topk 10") is dropped.
+    """
+
+    tokens = vega_zero_str.split()
+
+    if "transform" not in tokens:
+        return None
+
+    i = tokens.index("transform")
+
+    try:
+        vega_zero = VegaZero.parse(" ".join(tokens[:i]))
+    except VegaZeroError:
+        return None
+
+    clauses = []
+
+    for token in tokens[i + 1 :]:
+        if token in _TRANSFORM_KEYWORDS:
+            clauses.append([token])
+        elif len(clauses) > 0:
+            clauses[-1].append(token)
+
+    clauses = clauses[:-1]
+
+    if len(clauses) > 0:
+        try:
+            vega_zero.transform = VegaZeroTransform.parse(
+                " ".join(token for clause in clauses for token in clause)
+            )
+        except VegaZeroError:
+            return None
+
+    return vega_zero
+
+
 class Plot:
     def __init__(
         self,
         model: Optional[Callable[..., str]] = None,
+        timeout: Optional[float] = None,
+        fallback: Optional[Callable[..., str]] = None,
+        incremental: bool = False,
+        profile: Union[str, DecodingProfile, None] = None,
     ) -> None:
+        """
+        timeout is the prediction budget in seconds. The models stop decoding
+        when it's spent. Then the complete clauses of their output are used if
+        the encoding is complete, otherwise fallback (e.g. a cheaper model or
+        rules) is called with the same arguments as model.
+
+        incremental remembers the last call. If the next one on the same table
+        only changes structural kwargs (chart, sort order, limit, color), the
+        last VegaZero is patched without calling the model.
+
+        profile is the decoding profile ("fast", "balanced" or "accurate") for
+        the models. A DecodingProfile passed in the arguments of a call (e.g.
+        plot(df, "...", profile=vxnli.decoding.FAST)) overrides it.
+        """
+
         if model is None:
             from vxnli.models.v1.model import Model
 
             model = Model()
 
         self.model = model
+        self.timeout = timeout
+        self.fallback = fallback
+        self.incremental = incremental
+        self.profile = decoding.get(profile)
+
+        self.last_call: Optional[CallRecord] = None
+
+        self._session: Optional[_Session] = None
 
     def __call__(self, *args, **kwargs) -> alt.Chart:
+        start_time = time.perf_counter()
+
         data, args, kwargs = self._parse_args_and_kwargs(args, kwargs)
-        vega_zero = self.model(data, *args, **kwargs)
+        profile, args, kwargs = self._parse_profile(args, kwargs)
+
+        if profile is None:
+            profile = self.profile
+
+        profile_name = None if profile is None else profile.name
+
+        if self.incremental:
+            table_fingerprint = fingerprint(data)
+            vega_zero = self._patch(table_fingerprint, profile_name, data, args, kwargs)
+        else:
+            vega_zero = None
+
+        if vega_zero is None:
+            vega_zero, source = self._predict(data, args, kwargs, profile)
+        else:
+            source = "patch"
+
+        vega_zero, repairs = repair(vega_zero, data.columns)
+
+        if len(repairs) > 0:
+            logger.info(f"repaired column names: {repairs}")
+
+        prediction_time = time.perf_counter() - start_time
+
+        vega_lite = self._render(vega_zero, data)
+
+        if self.incremental:
+            # Results cut by the deadline aren't reused, the model is retried
+            if source in ("model", "patch"):
+                self._session = _Session(
+                    table_fingerprint, profile_name, args, kwargs, vega_zero
+                )
+            else:
+                self._session = None
+
+        total_time = time.perf_counter() - start_time
+
+        self.last_call = CallRecord(
+            vega_zero=str(vega_zero),
+            source=source,
+            prediction_time=prediction_time,
+            rendering_time=total_time - prediction_time,
+            total_time=total_time,
+            repairs=repairs,
+            profile=profile_name,
+        )
+
+        return vega_lite
+
+    def _patch(
+        self,
+        table_fingerprint: str,
+        profile_name: Optional[str],
+        data: pd.DataFrame,
+        args: Tuple,
+        kwargs: dict,
+    ) -> Optional[VegaZero]:
+        session = self._session
+
+        if session is None or session.fingerprint != table_fingerprint:
+            return None
+
+        if session.profile != profile_name:
+            return None
+
+        if not _equals(session.args, args):
+            return None
+
+        if session.kwargs.keys() - kwargs.keys():
+            return None
+
+        changed = {
+            k: v
+            for k, v in kwargs.items()
+            if k not in session.kwargs or not _equals(session.kwargs[k], v)
+        }
+
+        if len(changed) == 0:
+            return session.vega_zero
+
+        return patch(session.vega_zero, data.columns, changed)
+
+    def _predict(
+        self,
+        data: pd.DataFrame,
+        args: Tuple,
+        kwargs: dict,
+        profile: Optional[DecodingProfile],
+    ) -> Tuple[VegaZero, str]:
+        with _deadline.deadline(self.timeout), decoding.using(profile):
+            try:
+                vega_zero = self.model(data, *args, **kwargs)
+            except DeadlineExceededError:
+                # Remote models (vxnli.routing) can't return a partial output
+                vega_zero = ""
+                _deadline.cut()
+
+            # Cut by this deadline or by the model's own timeout
+            cut = _deadline.was_cut()
 
         logger.debug(f"vega_zero: {vega_zero}")
 
-        vega_zero = VegaZero.parse(vega_zero)
+        if not cut:
+            return VegaZero.parse(vega_zero), "model"
+
+        partial = _parse_partial(vega_zero)
+
+        if partial is not None:
+            return partial, "partial"
+
+        if self.fallback is None:
+            raise DeadlineExceededError(
+                f"No parseable vega_zero before the deadline: {vega_zero}"
+            )
+
+        vega_zero = self.fallback(data, *args, **kwargs)
 
+        logger.debug(f"fallback vega_zero: {vega_zero}")
+
+        return VegaZero.parse(vega_zero), "fallback"
+
+    def _render(self, vega_zero: VegaZero, data: pd.DataFrame) -> alt.Chart:
         # HACK: just in case
         data = data.copy()
 
@@ -62,6 +302,24 @@ class Plot:
 
         return d1 if d2 is None else d2, args, kwargs
 
+    def _parse_profile(
+        self, args: Tuple, kwargs: dict
+    ) -> Tuple[Optional[DecodingProfile], Tuple, dict]:
+        # Like dataframes, profiles are found by type, not by name
+        profiles = [arg for arg in args if isinstance(arg, DecodingProfile)]
+        profiles += [v for v in kwargs.values() if isinstance(v, DecodingProfile)]
+
+        if len(profiles) > 1:
+            raise InputError("Don't give multiple decoding profiles")
+
+        if len(profiles) == 0:
+            return None, args, kwargs
+
+        args = tuple(arg for arg in args if not isinstance(arg, DecodingProfile))
+        kwargs = {k: v for k, v in kwargs.items() if not isinstance(v, DecodingProfile)}
+
+        return profiles[0], args, kwargs
+
     def _parse_args(self, args: Tuple) -> Tuple[Optional[pd.DataFrame], Tuple]:
         data = [(i, arg) for i, arg in enumerate(args) if isinstance(arg, pd.DataFrame)]
 
@@ -86,4 +344,4 @@ class Plot:
 
         key, data = data[0]
 
-        return data, {k: v for k, v in data.items() if k != key}
+        return data, {k: v for k, v in kwargs.items() if k != key}
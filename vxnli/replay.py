@@ -0,0 +1,273 @@
+"""Replay the user-study sessions as a load test against Plot
+
+data/results/user-study/tasks/*.json records what the participants did: a
+Plot was created (__init__) for each task, then called with args and kwargs.
+Each simulated user replays one task with its own Plot, waiting the recorded
+think time (scaled) between calls. The tables of the study aren't recorded,
+so each task gets a synthetic table with the columns its VegaZero used.
+
+With RecordedModel, the model answers the recorded VegaZero after the recorded
+prediction time (scaled), so the harness can run without the weights.
+"""
+
+import dataclasses
+import glob
+import json
+import logging
+import random
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import pandas as pd
+
+from vxnli import _synthetic
+from vxnli._vega_zero import VegaZero
+from vxnli.errors import Error
+from vxnli.plot import CallRecord, Plot
+
+
+logger = logging.getLogger(__name__)
+
+
+SESSIONS_DIR = Path("data/results/user-study/tasks")
+
+
+@dataclasses.dataclass
+class RecordedCall:
+    args: Tuple
+    kwargs: dict
+    vega_zero: str
+    prediction_time: float
+    # Seconds the user spent before this call
+    think_time: float
+
+
+@dataclasses.dataclass
+class Session:
+    user_id: int
+    task: str
+    calls: List[RecordedCall]
+    table: pd.DataFrame
+
+
+def _key(args: Iterable, kwargs: dict) -> str:
+    return json.dumps([list(args), kwargs], sort_keys=True, default=str)
+
+
+def _parse_task(
+    user_id: int, task: str, events: List[Dict[str, Any]], rand: random.Random
+) -> Session:
+    calls, columns = [], []
+    last_timestamp = None
+
+    for event in events:
+        # "LOG BROKEN" events have no timestamp nor result
+        if event["event"] not in ("__init__", "__call__"):
+            continue
+
+        message = event["message"]
+
+        # Calls failed without a prediction (e.g. "timeout" or "validation"
+        # errors of the study) have nothing to replay
+        if event["event"] == "__call__" and "vega_zero" in message:
+            # The timestamp is logged when the call returns
+            if last_timestamp is None:
+                think_time = 0.0
+            else:
+                total_time = message.get("total_time", message["prediction_time"])
+
+                think_time = event["timestamp"] - last_timestamp
+                think_time = max(think_time - total_time, 0.0)
+
+            calls.append(
+                RecordedCall(
+                    args=tuple(message["args"]),
+                    kwargs=message["kwargs"],
+                    vega_zero=message["vega_zero"],
+                    prediction_time=message["prediction_time"],
+                    think_time=think_time,
+                )
+            )
+
+            try:
+                columns += _synthetic.columns(VegaZero.parse(message["vega_zero"]))
+            except Error:
+                pass
+
+        last_timestamp = event["timestamp"]
+
+    table = _synthetic.table(dict.fromkeys(columns), n_rows=20, rand=rand)
+
+    return Session(user_id=user_id, task=task, calls=calls, table=table)
+
+
+def load_sessions(
+    sessions_dir: Union[str, Path] = SESSIONS_DIR, seed: int = 123
+) -> List[Session]:
+    rand = random.Random(seed)
+    sessions = []
+
+    for path in sorted(glob.glob(str(Path(sessions_dir).joinpath("*.json")))):
+        with open(path) as f:
+            user = json.load(f)
+
+        for task in ("task_a", "task_b"):
+            for i, attempt in enumerate(user.get(task, [])):
+                session = _parse_task(
+                    user["user_id"], f"{task}[{i}]", attempt["events"], rand
+                )
+
+                if len(session.calls) > 0:
+                    sessions.append(session)
+
+    return sessions
+
+
+class RecordedModel:
+    """A stub model answering the recorded VegaZero of the same args and kwargs"""
+
+    def __init__(
+        self, sessions: Iterable[Session], prediction_time_scale: float = 1.0
+    ) -> None:
+        self.prediction_time_scale = prediction_time_scale
+
+        self._calls = {
+            _key(call.args, call.kwargs): call
+            for session in sessions
+            for call in session.calls
+        }
+
+    def __call__(self, table: pd.DataFrame, *args, **kwargs) -> str:
+        call = self._calls[_key(args, kwargs)]
+
+        time.sleep(call.prediction_time * self.prediction_time_scale)
+
+        return call.vega_zero
+
+
+@dataclasses.dataclass
+class Report:
+    n_users: int
+    n_calls: int
+    n_errors: int
+    elapsed: float
+    throughput: float
+    # {stage: {p50, p90, p95, p99, max}} for prediction, rendering and total
+    latency: Dict[str, Dict[str, float]]
+    # {source: count}, "patch" calls didn't reach the model (Plot.incremental)
+    sources: Dict[str, int]
+    patch_rate: float
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    if len(values) == 0:
+        return {}
+
+    values = sorted(values)
+
+    percentiles = {
+        f"p{int(p * 100)}": values[min(int(p * len(values)), len(values) - 1)]
+        for p in [0.5, 0.9, 0.95, 0.99]
+    }
+    percentiles["max"] = values[-1]
+
+    return percentiles
+
+
+def _replay_session(
+    session: Session,
+    plot_factory: Callable[[], Plot],
+    think_time_scale: float,
+    max_think_time: Optional[float],
+    records: List[CallRecord],
+    errors: List[Exception],
+    lock: threading.Lock,
+) -> None:
+    # A Plot per task, as in the study
+    plot = plot_factory()
+
+    for call in session.calls:
+        think_time = call.think_time
+
+        if max_think_time is not None:
+            think_time = min(think_time, max_think_time)
+
+        time.sleep(think_time * think_time_scale)
+
+        try:
+            plot(session.table, *call.args, **call.kwargs)
+        except Exception as e:
+            with lock:
+                errors.append(e)
+
+            continue
+
+        with lock:
+            records.append(plot.last_call)
+
+
+def replay(
+    sessions: List[Session],
+    plot_factory: Callable[[], Plot],
+    n_users: int = 16,
+    think_time_scale: float = 1.0,
+    max_think_time: Optional[float] = None,
+) -> Report:
+    """Replay sessions with n_users concurrent users
+
+    The users take the sessions in order, reusing them if n_users is larger.
+    think_time_scale 0 sends the calls back-to-back. max_think_time caps the
+    recorded breaks (in seconds, before scaling).
+    """
+
+    records, errors, lock = [], [], threading.Lock()
+
+    users = [sessions[i % len(sessions)] for i in range(n_users)]
+
+    start_time = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=n_users) as executor:
+        futures = [
+            executor.submit(
+                _replay_session,
+                session,
+                plot_factory,
+                think_time_scale,
+                max_think_time,
+                records,
+                errors,
+                lock,
+            )
+            for session in users
+        ]
+
+        for future in futures:
+            future.result()
+
+    elapsed = time.perf_counter() - start_time
+
+    for e in errors[:5]:
+        logger.warning(f"call failed: {e!r}")
+
+    sources = {}
+
+    for record in records:
+        sources[record.source] = sources.get(record.source, 0) + 1
+
+    return Report(
+        n_users=n_users,
+        n_calls=len(records) + len(errors),
+        n_errors=len(errors),
+        elapsed=elapsed,
+        throughput=(len(records) + len(errors)) / elapsed,
+        latency={
+            stage: _percentiles([getattr(r, f"{stage}_time") for r in records])
+            for stage in ["prediction", "rendering", "total"]
+        },
+        sources=sources,
+        patch_rate=sources.get("patch", 0) / max(len(records), 1),
+    )
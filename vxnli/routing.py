@@ -0,0 +1,245 @@
+"""Send requests for the same table to the same inference node
+
+Router is a model for Plot(model=...). It hashes the table (vxnli._fingerprint)
+onto a consistent hash ring of vxnli.server nodes, so the per-node caches keep
+hitting, and only the tables of a joining or leaving node move. Nodes failing
+a request or a health check are skipped until they're healthy again.
+"""
+
+import bisect
+import hashlib
+import json
+import logging
+import socket
+import threading
+import urllib.error
+import urllib.request
+
+from typing import Any, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from vxnli import _deadline, decoding
+from vxnli._fingerprint import fingerprint
+from vxnli.errors import DeadlineExceededError, InputError, RoutingError
+from vxnli.server import encode_table
+
+
+logger = logging.getLogger(__name__)
+
+
+# Seconds to wait for a node after the deadline
+_GRACE_PERIOD = 0.25
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    def __init__(self, nodes: Iterable[str] = (), replicas: int = 128) -> None:
+        self.replicas = replicas
+
+        self._hashes: List[int] = []
+        self._nodes: List[str] = []
+
+        for node in nodes:
+            self.add(node)
+
+    def __contains__(self, node: str) -> bool:
+        return node in self._nodes
+
+    @property
+    def members(self) -> List[str]:
+        return list(dict.fromkeys(self._nodes))
+
+    def add(self, node: str) -> None:
+        if node in self:
+            return
+
+        for i in range(self.replicas):
+            h = _hash(f"{node}#{i}")
+            j = bisect.bisect(self._hashes, h)
+
+            self._hashes.insert(j, h)
+            self._nodes.insert(j, node)
+
+    def remove(self, node: str) -> None:
+        kept = [(h, n) for h, n in zip(self._hashes, self._nodes) if n != node]
+
+        self._hashes = [h for h, _ in kept]
+        self._nodes = [n for _, n in kept]
+
+    def nodes(self, key: str) -> List[str]:
+        """All the nodes, clockwise from key"""
+
+        if len(self._hashes) == 0:
+            return []
+
+        start = bisect.bisect(self._hashes, _hash(key))
+        nodes = []
+
+        for i in range(len(self._nodes)):
+            node = self._nodes[(start + i) % len(self._nodes)]
+
+            if node not in nodes:
+                nodes.append(node)
+
+        return nodes
+
+
+class Router:
+    def __init__(
+        self,
+        endpoints: Iterable[str],
+        replicas: int = 128,
+        timeout: float = 60.0,
+        health_interval: Optional[float] = 5.0,
+    ) -> None:
+        """
+        endpoints are the base URLs of vxnli.server nodes
+        (e.g. http://127.0.0.1:8000). timeout is the request timeout in seconds
+        when no deadline is set. health_interval None disables the background
+        health checks, then failed nodes are retried on the next request.
+        """
+
+        self.timeout = timeout
+        self.health_interval = health_interval
+
+        # The node that served the last call
+        self.last_node: Optional[str] = None
+
+        self._ring = HashRing(replicas=replicas)
+        self._down = set()
+        self._lock = threading.Lock()
+
+        for endpoint in endpoints:
+            self.add_node(endpoint)
+
+        self._stop = threading.Event()
+        self._health_thread = None
+
+        if health_interval is not None:
+            self._health_thread = threading.Thread(
+                target=self._check_health_forever, daemon=True
+            )
+            self._health_thread.start()
+
+    @property
+    def healthy_nodes(self) -> List[str]:
+        with self._lock:
+            return [n for n in self._ring.members if n not in self._down]
+
+    def add_node(self, endpoint: str) -> None:
+        with self._lock:
+            self._ring.add(endpoint.rstrip("/"))
+
+    def remove_node(self, endpoint: str) -> None:
+        with self._lock:
+            self._ring.remove(endpoint.rstrip("/"))
+            self._down.discard(endpoint.rstrip("/"))
+
+    def close(self) -> None:
+        self._stop.set()
+
+    def check_health(self) -> None:
+        with self._lock:
+            nodes = self._ring.members
+
+        for node in nodes:
+            try:
+                with urllib.request.urlopen(f"{node}/health", timeout=2.0) as res:
+                    healthy = json.load(res).get("status") == "ok"
+            except (OSError, ValueError):
+                healthy = False
+
+            with self._lock:
+                if healthy:
+                    self._down.discard(node)
+                else:
+                    self._down.add(node)
+
+    def _check_health_forever(self) -> None:
+        while not self._stop.wait(self.health_interval):
+            self.check_health()
+
+    def _candidates(self, key: str) -> List[str]:
+        with self._lock:
+            nodes = self._ring.nodes(key)
+            down = set(self._down)
+
+        # Down nodes last, in case they're back
+        return [n for n in nodes if n not in down] + [n for n in nodes if n in down]
+
+    def _post(self, node: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        timeout = _deadline.remaining()
+
+        if timeout is None:
+            timeout = self.timeout
+        else:
+            # The node stops decoding at the deadline. Wait a little longer to
+            # receive what it decoded so far.
+            payload = {**payload, "timeout": max(timeout, 0.0)}
+            timeout = max(timeout, 0.0) + _GRACE_PERIOD
+
+        request = urllib.request.Request(
+            f"{node}/predict",
+            data=json.dumps(payload, default=str).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as res:
+                return json.load(res)
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.load(e)["error"]
+            except (ValueError, KeyError):
+                message = str(e)
+
+            if e.code == 400:
+                raise InputError(message)
+
+            # e.g. the model crashed on the node, try the next one
+            raise RoutingError(f"{node}: {message}")
+
+    def __call__(self, table: pd.DataFrame, *args, **kwargs) -> str:
+        key = fingerprint(table)
+        profile = decoding.current()
+
+        payload = {
+            "table": encode_table(table),
+            "args": list(args),
+            "kwargs": kwargs,
+            "fingerprint": key,
+            "profile": None if profile is None else profile.name,
+        }
+
+        for node in self._candidates(key):
+            try:
+                response = self._post(node, payload)
+            except (
+                urllib.error.URLError,
+                socket.timeout,
+                ConnectionError,
+                RoutingError,
+            ) as e:
+                if _deadline.expired():
+                    raise DeadlineExceededError(f"{node} didn't answer in time")
+
+                logger.warning(f"{node} failed, trying the next node: {e!r}")
+
+                with self._lock:
+                    self._down.add(node)
+
+                continue
+
+            self.last_node = node
+
+            # The node's model stopped early, the output is truncated
+            if response.get("cut"):
+                _deadline.cut()
+
+            return response["vega_zero"]
+
+        raise RoutingError("No inference node answered")
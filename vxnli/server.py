@@ -0,0 +1,269 @@
+"""A minimal HTTP inference node
+
+    POST /predict  {"table": <encode_table(DataFrame)>, "args": [...],
+                    "kwargs": {...}, "fingerprint": "...", "timeout": 1.5,
+                    "profile": "fast"}
+                -> {"vega_zero": "...", "node": "...", "cached": false,
+                    "cut": false}
+    GET /health -> {"status": "ok", "node": "...", "cache_hits": 0, ...}
+
+Predictions are cached per node by table fingerprint and arguments, which is
+what vxnli.routing.Router keeps hitting by sending a table to the same node.
+A node predicts one request at a time, run() starts several of them.
+"""
+
+import json
+import logging
+import multiprocessing
+import threading
+
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+import pandas as pd
+
+from vxnli import _deadline, config, decoding
+from vxnli._fingerprint import fingerprint
+from vxnli.errors import InputError
+
+
+logger = logging.getLogger(__name__)
+
+
+def encode_table(table: pd.DataFrame) -> Dict[str, Any]:
+    """A JSON-able table, decoded with the same values and dtypes
+
+    DataFrame.to_json/read_json round trips infer the dtypes again (e.g. the
+    str "01234" becomes the int 1234), and the model input would differ.
+    """
+
+    split = table.to_dict(orient="split")
+
+    return {
+        "columns": split["columns"],
+        "data": split["data"],
+        "dtypes": [str(dtype) for dtype in table.dtypes],
+    }
+
+
+def decode_table(encoded: Dict[str, Any]) -> pd.DataFrame:
+    table = pd.DataFrame(encoded["data"], columns=encoded["columns"])
+
+    dtypes = {
+        column: dtype
+        for column, dtype in zip(table.columns, encoded["dtypes"])
+        if dtype != "object"
+    }
+
+    return table.astype(dtypes)
+
+
+class InferenceServer:
+    def __init__(
+        self,
+        model: Callable[..., str],
+        host: str = "127.0.0.1",
+        port: int = 8000,
+        name: Optional[str] = None,
+        cache_size: int = 1024,
+    ) -> None:
+        self.model = model
+        self.cache_size = cache_size
+
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+        # One generate() at a time, run more processes to scale
+        self._model_lock = threading.Lock()
+
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+
+        self.name = f"{host}:{self.port}" if name is None else name
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def serve_forever(self) -> None:
+        logger.info(f"serving {self.name} on port {self.port}")
+
+        self._server.serve_forever()
+
+    def shutdown(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            "status": "ok",
+            "node": self.name,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+        }
+
+    def predict(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        table = decode_table(request["table"])
+
+        args = request.get("args", [])
+        kwargs = request.get("kwargs", {})
+        profile = request.get("profile")
+
+        table_fingerprint = request.get("fingerprint") or fingerprint(table)
+        key = json.dumps(
+            [table_fingerprint, args, kwargs, profile], sort_keys=True, default=str
+        )
+
+        with self._cache_lock:
+            vega_zero = self._cache.get(key)
+
+            if vega_zero is None:
+                self.cache_misses += 1
+            else:
+                self.cache_hits += 1
+                self._cache.move_to_end(key)
+
+        if vega_zero is not None:
+            return {
+                "vega_zero": vega_zero,
+                "node": self.name,
+                "cached": True,
+                "cut": False,
+            }
+
+        with _deadline.deadline(request.get("timeout")), decoding.using(profile):
+            with self._model_lock:
+                vega_zero = self.model(table, *args, **kwargs)
+
+            cut = _deadline.was_cut()
+
+        # Cut by the deadline, don't serve it to the next caller
+        if not cut:
+            with self._cache_lock:
+                self._cache[key] = vega_zero
+
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return {"vega_zero": vega_zero, "node": self.name, "cached": False, "cut": cut}
+
+    def _handler(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, status: int, body: Dict[str, Any]) -> None:
+                body = json.dumps(body).encode()
+
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self) -> None:
+                if self.path == "/health":
+                    self._reply(200, server.health())
+                else:
+                    self._reply(404, {"error": f"Not found: {self.path}"})
+
+            def do_POST(self) -> None:
+                if self.path != "/predict":
+                    self._reply(404, {"error": f"Not found: {self.path}"})
+                    return
+
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    request = json.loads(self.rfile.read(length))
+
+                    self._reply(200, server.predict(request))
+                except (InputError, KeyError, ValueError) as e:
+                    self._reply(400, {"error": str(e)})
+                except Exception as e:
+                    logger.exception("prediction failed")
+                    self._reply(500, {"error": repr(e)})
+
+            def log_message(self, format: str, *args: Tuple) -> None:
+                logger.debug(format % args)
+
+        return Handler
+
+
+def _run(
+    huggingface_model: Union[str, Path],
+    version: str,
+    host: str,
+    port: int,
+    name: Optional[str],
+    cache_size: int,
+) -> None:
+    if version == "v0":
+        from vxnli.models.v0.model import Model
+    else:
+        from vxnli.models.v1.model import Model
+
+    server = InferenceServer(
+        Model(huggingface_model),
+        host=host,
+        port=port,
+        name=name,
+        cache_size=cache_size,
+    )
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+def run(
+    huggingface_model: Union[str, Path] = "kwkty/vxnli-v1",
+    version: str = "v1",
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    name: Optional[str] = None,
+    cache_size: int = 1024,
+    workers: Optional[int] = None,
+) -> None:
+    """Serve workers nodes on consecutive ports from port
+
+    workers defaults to the count found by `vxnli tune` (vxnli.config).
+    """
+
+    workers = config.load().workers if workers is None else workers
+
+    if workers == 1:
+        _run(huggingface_model, version, host, port, name, cache_size)
+        return
+
+    ctx = multiprocessing.get_context("spawn")
+
+    processes = [
+        ctx.Process(
+            target=_run,
+            args=(
+                huggingface_model,
+                version,
+                host,
+                port + i,
+                None if name is None else f"{name}-{i}",
+                cache_size,
+            ),
+        )
+        for i in range(workers)
+    ]
+
+    for process in processes:
+        process.start()
+
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+            process.join()
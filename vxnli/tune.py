@@ -0,0 +1,291 @@
+"""Find the torch threads, batch size and worker count for this host
+
+Each setting runs in fresh worker processes (torch thread counts can only be
+set once per process), on synthetic tables built from the VegaZero of
+data/datasets/vxnli-v1, so the nvBench databases aren't needed.
+The fastest setting within the latency limit is saved with vxnli.config.
+"""
+
+import dataclasses
+import itertools
+import logging
+import multiprocessing
+import os
+import queue as queue_module
+import random
+import time
+
+from pathlib import Path
+from typing import Any, Iterable, List, Optional, Tuple, Union
+
+import pandas as pd
+
+from vxnli import _synthetic, config
+from vxnli._vega_zero import VegaZero
+from vxnli.config import HostConfig
+from vxnli.dataset import DATASET_DIR, iter_examples
+from vxnli.errors import Error, VegaZeroError
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class Measurement:
+    config: HostConfig
+    throughput: float
+    p50: float
+    p95: float
+    p99: float
+
+
+def synthetic_requests(
+    path: Union[str, Path] = DATASET_DIR.joinpath("test.ndjson"),
+    n_requests: int = 64,
+    n_rows: int = 20,
+    seed: int = 123,
+    version: str = "v1",
+) -> List[Tuple[pd.DataFrame, Tuple, dict]]:
+    """Queries of the dataset with random tables having the columns they use
+
+    With version "v0", only the examples with a single nl query (no kwargs).
+    """
+
+    rand = random.Random(seed)
+    examples = list(iter_examples(path))
+
+    if version == "v0":
+        examples = [
+            example
+            for example in examples
+            if len(example["kwargs"]) == 0
+            and len(example["args"]) == 1
+            and isinstance(example["args"][0], str)
+        ]
+    examples = rand.sample(examples, min(n_requests, len(examples)))
+
+    requests = []
+
+    for example in examples:
+        try:
+            columns = _synthetic.columns(VegaZero.parse(example["vega_zero"]))
+        except VegaZeroError:
+            continue
+
+        table = _synthetic.table(columns, n_rows, rand)
+
+        requests.append((table, tuple(example["args"]), example["kwargs"]))
+
+    return requests
+
+
+def _percentile(values: List[float], p: float) -> float:
+    values = sorted(values)
+
+    return values[min(int(p * len(values)), len(values) - 1)]
+
+
+def _worker(
+    model_name: str,
+    version: str,
+    host_config: HostConfig,
+    requests: List[Tuple[pd.DataFrame, Tuple, dict]],
+    barrier: Any,
+    queue: Any,
+) -> None:
+    try:
+        if version == "v0":
+            from vxnli.models.v0.model import Model
+        else:
+            from vxnli.models.v1.model import Model
+
+        model = Model(model_name, host_config=host_config)
+
+        # Warm up
+        model.batch(requests[: host_config.batch_size])
+
+        barrier.wait()
+
+        latencies = []
+        start_time = time.perf_counter()
+
+        for i in range(0, len(requests), host_config.batch_size):
+            batch = requests[i : i + host_config.batch_size]
+
+            batch_start_time = time.perf_counter()
+            model.batch(batch)
+
+            latencies += [time.perf_counter() - batch_start_time] * len(batch)
+    except Exception as e:
+        # Release the peers waiting at the barrier, they fail too
+        barrier.abort()
+        queue.put(("error", repr(e)))
+
+        return
+
+    queue.put(("ok", (latencies, time.perf_counter() - start_time)))
+
+
+def measure(
+    host_config: HostConfig,
+    requests: List[Tuple[pd.DataFrame, Tuple, dict]],
+    model_name: str = "kwkty/vxnli-v1",
+    version: str = "v1",
+    timeout: float = 3600.0,
+) -> Measurement:
+    """Run the requests with host_config, waiting timeout seconds per worker"""
+
+    ctx = multiprocessing.get_context("spawn")
+
+    barrier = ctx.Barrier(host_config.workers)
+    queue = ctx.Queue()
+
+    workers = [
+        ctx.Process(
+            target=_worker,
+            args=(
+                model_name,
+                version,
+                host_config,
+                requests[i :: host_config.workers],
+                barrier,
+                queue,
+            ),
+        )
+        for i in range(host_config.workers)
+    ]
+
+    for worker in workers:
+        worker.start()
+
+    results, errors = [], []
+
+    try:
+        for _ in workers:
+            status, result = queue.get(timeout=timeout)
+
+            if status == "ok":
+                results.append(result)
+            else:
+                errors.append(result)
+    except queue_module.Empty:
+        errors.append(f"no result within {timeout}s")
+
+    for worker in workers:
+        if len(errors) > 0:
+            worker.terminate()
+
+        worker.join()
+
+    if len(errors) > 0:
+        raise Error(f"{host_config} failed: {errors[0]}")
+
+    latencies = [
+        latency for worker_latencies, _ in results for latency in worker_latencies
+    ]
+    elapsed = max(worker_elapsed for _, worker_elapsed in results)
+
+    return Measurement(
+        config=host_config,
+        throughput=len(latencies) / elapsed,
+        p50=_percentile(latencies, 0.5),
+        p95=_percentile(latencies, 0.95),
+        p99=_percentile(latencies, 0.99),
+    )
+
+
+def candidates(
+    threads: Iterable[int],
+    inter_op_threads: Iterable[int],
+    batch_sizes: Iterable[int],
+    workers: Iterable[int],
+    cpu_count: Optional[int] = None,
+) -> List[HostConfig]:
+    """The grid of settings that don't oversubscribe the cores"""
+
+    cpu_count = os.cpu_count() if cpu_count is None else cpu_count
+
+    return [
+        HostConfig(
+            intra_op_threads=t,
+            inter_op_threads=i,
+            batch_size=b,
+            workers=w,
+        )
+        for t, i, b, w in itertools.product(
+            threads, inter_op_threads, batch_sizes, workers
+        )
+        if t * w <= cpu_count
+    ]
+
+
+def tune(
+    host_configs: List[HostConfig],
+    requests: List[Tuple[pd.DataFrame, Tuple, dict]],
+    model_name: str = "kwkty/vxnli-v1",
+    version: str = "v1",
+    max_p95: Optional[float] = None,
+) -> Tuple[Optional[Measurement], List[Measurement]]:
+    """Measure every setting, and return the fastest one within max_p95"""
+
+    measurements = []
+
+    for host_config in host_configs:
+        measurement = measure(host_config, requests, model_name, version)
+        measurements.append(measurement)
+
+        logger.info(
+            f"{host_config}: {measurement.throughput:.2f} req/s, "
+            f"p50 {measurement.p50:.3f}s, p95 {measurement.p95:.3f}s"
+        )
+
+    accepted = [m for m in measurements if max_p95 is None or m.p95 <= max_p95]
+
+    if len(accepted) == 0:
+        return None, measurements
+
+    return max(accepted, key=lambda m: m.throughput), measurements
+
+
+def run(
+    model_name: str = "kwkty/vxnli-v1",
+    version: str = "v1",
+    dataset_path: Union[str, Path] = DATASET_DIR.joinpath("test.ndjson"),
+    n_requests: int = 64,
+    threads: Optional[List[int]] = None,
+    inter_op_threads: Optional[List[int]] = None,
+    batch_sizes: Optional[List[int]] = None,
+    workers: Optional[List[int]] = None,
+    max_p95: Optional[float] = None,
+    output: Union[str, Path, None] = None,
+) -> Optional[Path]:
+    cpu_count = os.cpu_count() or 1
+    powers = [n for n in [1, 2, 4, 8, 16, 32, 64] if n <= cpu_count]
+
+    host_configs = candidates(
+        threads=powers if threads is None else threads,
+        inter_op_threads=[1, 2] if inter_op_threads is None else inter_op_threads,
+        batch_sizes=[1, 4, 8] if batch_sizes is None else batch_sizes,
+        workers=powers if workers is None else workers,
+        cpu_count=cpu_count,
+    )
+
+    requests = synthetic_requests(dataset_path, n_requests, version=version)
+
+    best, measurements = tune(host_configs, requests, model_name, version, max_p95)
+
+    if best is None:
+        logger.error(f"No setting has p95 latency <= {max_p95}s")
+
+        return None
+
+    return config.save(
+        best.config,
+        output,
+        measured={
+            "model": str(model_name),
+            "cpu_count": cpu_count,
+            "n_requests": len(requests),
+            "results": [dataclasses.asdict(m) for m in measurements],
+        },
+    )